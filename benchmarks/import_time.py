@@ -0,0 +1,62 @@
+"""Measure how long ``import sng`` takes, and how much memory it needs.
+
+Every repetition imports the package in a fresh Python process, so that
+nothing is cached in ``sys.modules``. Run from the repository root::
+
+    python benchmarks/import_time.py --repeat 10
+
+The results are printed as JSON.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+CHILD = """
+import json, resource, sys, time
+start = time.time()
+import sng
+sng.show_builtin_wordlists()
+sng.Config()
+elapsed = time.time() - start
+print(json.dumps({
+    'seconds': elapsed,
+    # ru_maxrss is in KB on Linux
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'tensorflow_loaded': 'tensorflow' in sys.modules,
+    'keras_loaded': 'keras' in sys.modules,
+}))
+"""
+
+
+def measure_import(repeat=5):
+    """Import sng ``repeat`` times in fresh processes.
+
+    Returns
+    -------
+    dict : The median and minimum import time, the largest peak RSS, and
+        whether Keras or TensorFlow were imported as a side effect.
+    """
+
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', CHILD])
+        runs.append(json.loads(output.decode().strip().splitlines()[-1]))
+
+    seconds = sorted(run['seconds'] for run in runs)
+    return {
+        'repeat': repeat,
+        'median_seconds': seconds[len(seconds) // 2],
+        'min_seconds': seconds[0],
+        'max_rss_mb': max(run['max_rss_mb'] for run in runs),
+        'tensorflow_loaded': any(run['tensorflow_loaded'] for run in runs),
+        'keras_loaded': any(run['keras_loaded'] for run in runs),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(measure_import(args.repeat), indent=2))
@@ -0,0 +1,200 @@
+"""Benchmark preprocessing, training and simulation on the builtin wordlists.
+
+For every wordlist, this measures
+
+- the preprocessing time of ``sng.Generator``, without and with the corpus
+  cache,
+- the time and memory it takes to encode the corpus, and to build the
+  input tensors of every batch from it in one epoch, and the share of
+  padding in them,
+- epochs per second of ``fit()``, for every backend that can be imported,
+- words per second of ``simulate()`` at several ``n`` and temperatures.
+
+Run from the repository root::
+
+    python benchmarks/suite.py --epochs 3 --output results.json
+    python benchmarks/suite.py --baseline results.json
+
+The results are printed as JSON, or written to ``--output``. With
+``--baseline``, every timing is also compared to an earlier result file.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import sng  # noqa: E402
+
+
+def best_of(function, repeat):
+    """The shortest wall time of ``repeat`` calls, in seconds.
+    """
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def available_backends():
+    backends = ['ngram']
+    try:
+        import keras  # noqa: F401
+        backends.insert(0, 'lstm')
+    except ImportError:
+        pass
+    return backends
+
+
+def benchmark_wordlist(name, backends, epochs, sizes, temperatures, repeat):
+    """Run all measurements on one builtin wordlist.
+
+    Returns
+    -------
+    dict : The results, see the module docstring.
+    """
+
+    wordlist_file = os.path.join(os.path.dirname(sng.__file__),
+                                 'wordlists', name)
+    result = {}
+
+    cfg = sng.Config(verbose=False, use_cache=False)
+    result['preprocess_seconds'] = best_of(
+        lambda: sng.Generator(config=cfg, wordlist_file=wordlist_file),
+        repeat)
+    cached = sng.Config(verbose=False)
+    sng.Generator(config=cached, wordlist_file=wordlist_file)
+    result['preprocess_cached_seconds'] = best_of(
+        lambda: sng.Generator(config=cached, wordlist_file=wordlist_file),
+        repeat)
+
+    gen = sng.Generator(config=cfg, wordlist_file=wordlist_file)
+    result['corpus_size'] = gen.corpus_size
+    result['vocab_size'] = gen.vocab_size
+    # fit() encodes the corpus once, and then builds the input tensors of
+    # every batch as it goes:
+    result['encode_seconds'] = best_of(gen._encode_corpus, repeat)
+    seqs = gen._encode_corpus()
+    result['encoded_mb'] = seqs.nbytes / 2**20
+    lengths = np.sum(seqs >= 0, axis=1)
+    batches = sng.helpers.length_buckets(lengths, cfg.batch_size)
+    padded = [seqs[batch, :np.max(lengths[batch])] for batch in batches]
+    result['batch_encode_seconds'] = best_of(
+        lambda: [gen._encode(None, batch) for batch in padded], repeat)
+    result['batch_tensor_mb'] = max(
+        sum(array.nbytes for array in gen._encode(None, batch))
+        for batch in padded) / 2**20
+
+    # The share of padded timesteps, with one width for the whole corpus,
+    # and with batches of similar length as in fit():
+    result['padding_fraction'] = 1 - np.sum(lengths) / seqs.size
+    result['bucketed_padding_fraction'] = 1 - np.sum(lengths) / sum(
+        len(batch) * np.max(lengths[batch]) for batch in batches)
+
+    for backend in backends:
+        gen = sng.Generator(config=sng.Config(
+            verbose=False, backend=backend, epochs=epochs),
+            wordlist_file=wordlist_file)
+        gen.fit()
+        fit = {'fit_seconds': gen.timings['fit']}
+        if backend == 'lstm':
+            fit['epochs_per_second'] = epochs / gen.timings['fit']
+
+        # Simulate with the NumPy backend, as in production:
+        with tempfile.TemporaryDirectory() as directory:
+            gen.save(os.path.join(directory, 'model'))
+            sampler = sng.Sampler.load(os.path.join(directory, 'model'))
+
+        simulate = {}
+        for n in sizes:
+            for temperature in temperatures:
+                seconds = best_of(
+                    lambda: sampler.simulate(n, temperature=temperature),
+                    repeat)
+                key = 'n=' + str(n) + ',temperature=' + str(temperature)
+                simulate[key] = {'seconds': seconds,
+                                 'words_per_second': n / seconds}
+        fit['simulate'] = simulate
+        result[backend] = fit
+
+    return result
+
+
+def run(wordlists=None, epochs=3, sizes=(10, 1000, 10000),
+        temperatures=(0.5, 1.0, 1.5), repeat=3):
+    """Benchmark several builtin wordlists.
+
+    Returns
+    -------
+    dict : The results per wordlist, plus the versions and the machine
+        they were measured with.
+    """
+
+    if wordlists is None:
+        wordlists = sng.show_builtin_wordlists()
+    backends = available_backends()
+    return {
+        'sng_version': sng.__version__,
+        'numpy_version': np.__version__,
+        'python_version': platform.python_version(),
+        'machine': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'backends': backends,
+        'wordlists': {
+            name: benchmark_wordlist(name, backends, epochs, sizes,
+                                     temperatures, repeat)
+            for name in sorted(wordlists)
+        },
+    }
+
+
+def compare(results, baseline, prefix=''):
+    """Yield ``(key, ratio)`` for every timing in both result dicts, where
+    a ratio above 1 means the new result is slower.
+    """
+
+    for key, value in results.items():
+        if key not in baseline:
+            continue
+        if isinstance(value, dict):
+            yield from compare(value, baseline[key], prefix + key + '/')
+        elif key.endswith('seconds') and baseline[key] > 0:
+            yield prefix + key, value / baseline[key]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--wordlist', action='append',
+                        help='A builtin wordlist, e.g. latin.txt. '
+                        'Can be repeated. Default: all of them.')
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Write the JSON results here.')
+    parser.add_argument('--baseline', help='Earlier results to compare to.')
+    args = parser.parse_args()
+
+    # Keep the corpus cache of the benchmark separate:
+    os.environ.setdefault('SNG_CACHE_DIR', tempfile.mkdtemp())
+
+    results = run(args.wordlist, epochs=args.epochs, repeat=args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key, ratio in compare(results['wordlists'],
+                                  baseline['wordlists']):
+            print('{:>7.2f}x  {}'.format(ratio, key), file=sys.stderr)
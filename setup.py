@@ -36,6 +36,10 @@ setup(name='sng',
           'tensorflow',
           'numpy'
       ],
+      entry_points={
+          'console_scripts': ['sng=sng.cli:main',
+                              'sng-server=sng.server:main'],
+      },
       setup_requires=['pytest-runner'],
       tests_require=['pytest'],
       zip_safe=False)
@@ -0,0 +1,122 @@
+"""The BloomFilter module. It defines the BloomFilter class, a
+fixed-size set for deduplicating large streams of words.
+"""
+
+import hashlib
+import math
+import numpy as np
+
+
+class BloomFilter:
+    """A probabilistic set of strings with a fixed memory footprint.
+
+    Membership tests never give false negatives, but may give false
+    positives, i.e. report a word as present that was never added. The
+    probability of that is about ``error_rate`` as long as no more than
+    ``capacity`` words were added.
+
+    Parameters
+    ----------
+    capacity : int
+        The number of words the filter is sized for.
+    error_rate : float
+        The false positive rate at full capacity.
+
+    Examples
+    --------
+    ::
+
+        seen = sng.BloomFilter(capacity=10**6)
+        seen.add('alpha')   # True, since 'alpha' was new
+        seen.add('alpha')   # False
+        'alpha' in seen     # True
+    """
+
+    def __init__(self, capacity=10**6, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        self.n_bits = int(math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, int(round(
+            self.n_bits / capacity * math.log(2))))
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, words):
+        """The bit positions of every word, as a ``(len(words), n_hashes)``
+        array. Uses double hashing on one 128 bit digest per word.
+        """
+
+        digests = b''.join(
+            hashlib.md5(word.encode('utf-8')).digest() for word in words)
+        hashes = np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+        h1 = hashes[:, :1]
+        h2 = hashes[:, 1:] | np.uint64(1)
+        i = np.arange(self.n_hashes, dtype=np.uint64)
+        # uint64 arithmetic wraps around, which is fine for hashing:
+        with np.errstate(over='ignore'):
+            positions = h1 + i * h2
+        return positions % np.uint64(self.n_bits)
+
+    @staticmethod
+    def _split(positions):
+        """Convert bit positions to byte indices and bit masks."""
+        shifts = (positions % np.uint64(8)).astype(np.uint8)
+        return positions // np.uint64(8), np.left_shift(np.uint8(1), shifts)
+
+    def _test(self, positions):
+        byte_ix, mask = self._split(positions)
+        return np.all(self.bits[byte_ix] & mask, axis=-1)
+
+    def add(self, word):
+        """Add a word.
+
+        Returns
+        -------
+        bool : True if the word was not in the filter before.
+        """
+
+        positions = self._positions([word])[0]
+        is_new = not self._test(positions)
+        byte_ix, mask = self._split(positions)
+        np.bitwise_or.at(self.bits, byte_ix, mask)
+        return is_new
+
+    def update(self, words):
+        """Add many words at once.
+
+        Returns
+        -------
+        numpy array : A boolean array, True for the words that were not in
+            the filter before, and not repeated earlier in ``words``.
+        """
+
+        if len(words) == 0:
+            return np.zeros(0, dtype=bool)
+        first = {}
+        for i, word in enumerate(words):
+            first.setdefault(word, i)
+        is_new = np.zeros(len(words), dtype=bool)
+        is_new[list(first.values())] = True
+
+        positions = self._positions(words)
+        is_new &= ~self._test(positions)
+        byte_ix, mask = self._split(positions)
+        np.bitwise_or.at(self.bits, byte_ix.ravel(), mask.ravel())
+        return is_new
+
+    def contains(self, words):
+        """Test many words at once.
+
+        Returns
+        -------
+        numpy array : A boolean array, True for words that are (probably)
+            in the filter.
+        """
+
+        if len(words) == 0:
+            return np.zeros(0, dtype=bool)
+        return self._test(self._positions(words))
+
+    def __contains__(self, word):
+        return bool(self.contains([word])[0])
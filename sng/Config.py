@@ -41,9 +41,28 @@ class Config:
         """bool: If true, prints helpful messages on what is happening.
         """
 
+        self.use_cache = True
+        """bool: If true, the processed ``wordlist_file`` (unique words,
+        characters, encoded sequences) is cached in the user's cache folder,
+        see :mod:`sng.cache`, so that the next Generator on the same file
+        skips the preprocessing.
+        """
+
         # ################################################################
         # Training
 
+        self.backend = 'lstm'
+        """str: The model to train. ``'lstm'`` for the recurrent neural
+        network, ``'ngram'`` for a character n-gram model
+        (:class:`sng.NGramModel`), which trains in seconds and doesn't need
+        Keras. The other training options only apply to the LSTM.
+        """
+
+        self.ngram_order = 4
+        """int: How many characters the n-gram model looks at, including
+        the predicted one.
+        """
+
         self.epochs = 100
         """int: How many epochs to train the RNN for?
         """
@@ -60,6 +79,89 @@ class Config:
         """int: Number of hidden units per LSTM layer
         """
 
+        self.learning_rate = 0.001
+        """float: The initial learning rate of the RMSprop optimizer.
+        """
+
+        self.lr_schedule = None
+        """list or None: A learning rate schedule, as a list of
+        ``[epoch, learning_rate]`` pairs. From each epoch (counted from 0)
+        on, the paired learning rate is used. Before the first pair, and if
+        None, ``learning_rate`` is used.
+        """
+
+        self.validation_split = 0.0
+        """float: The fraction of the words to hold out for computing a
+        validation loss after every epoch. Ignored in streaming mode.
+        """
+
+        self.early_stopping_patience = None
+        """int or None: If set, stop training once the validation loss
+        (or the training loss, without validation split) hasn't improved
+        for this many epochs, and keep the best weights.
+        """
+
+        self.checkpoint_every = 10
+        """int: How many epochs between two checkpoints, if ``fit()`` is
+        given a ``checkpoint_dir``.
+        """
+
+        self.embedding_dim = None
+        """int or None: If set, words are fed to the network as integer
+        sequences through an Embedding layer of this size instead of as
+        one-hot vectors. The training data then needs memory proportional
+        to the corpus size times the word length, independent of the
+        vocabulary size.
+        """
+
+        # ################################################################
+        # Corpus
+
+        self.line_mode = False
+        """bool: If true, every line of the ``wordlist_file`` is one name,
+        e.g. a company name with spaces and ampersands. The names keep
+        their case and symbols. Otherwise, the corpus is split into
+        lowercase words, and symbols and digits are removed.
+        """
+
+        self.max_vocab_size = None
+        """int or None: If set, only the most frequent characters get their
+        own index, up to this number including the newline. The rare ones
+        share ``rare_buckets`` indices, by a hash of the character, and are
+        replaced by the most frequent character of their bucket. This
+        bounds the size of the one-hot inputs and of the softmax for
+        symbol-rich corpora.
+        """
+
+        self.rare_buckets = 1
+        """int: The number of shared indices for rare characters, see
+        ``max_vocab_size``.
+        """
+
+        # ################################################################
+        # Streaming (see the ``streaming`` argument of sng.Generator)
+
+        self.chunk_size = 2**20
+        """int: How many characters to read from the corpus file at a time.
+        """
+
+        self.shuffle_buffer = 10000
+        """int: How many words to hold in memory for shuffling the
+        training data.
+        """
+
+        self.dedup_capacity = 10**7
+        """int: How many unique words the Bloom filter for deduplicating
+        the corpus is sized for. Its memory use grows with this number, not
+        with the actual corpus size.
+        """
+
+        self.dedup_error_rate = 0.001
+        """float: The Bloom filter's false positive rate at full capacity,
+        i.e. the fraction of unique words that are dropped as supposed
+        duplicates.
+        """
+
         # ################################################################
         # Simulation
 
@@ -76,6 +178,16 @@ class Config:
         sampling probabilities will be more conservative.
         """
 
+        self.top_k = None
+        """int or None: If set, only sample from the ``top_k`` most likely
+        characters at every position.
+        """
+
+        self.top_p = None
+        """float or None: If set, only sample from the most likely
+        characters whose total probability is at least ``top_p``.
+        """
+
         self.suffix = ''
         """str: A suffix to append to the suggested names.
 
@@ -91,6 +203,12 @@ class Config:
 
         self.__dict__.update(kwargs)
 
+    def __setstate__(self, state):
+        # Configs pickled by older versions lack newer options. Start from
+        # the defaults so that those options are always present.
+        self.__init__()
+        self.__dict__.update(state)
+
     def to_dict(self):
         """Convert Config object to dictionary.
         """
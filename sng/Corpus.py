@@ -0,0 +1,175 @@
+"""The Corpus module. It defines the Corpus class, a compact, memory-mapped
+store of a wordlist.
+"""
+
+import hashlib
+import os
+import shutil
+import numpy as np
+
+FILES = ['words.bin', 'offsets.npy', 'lengths.npy', 'hashes.npy']
+"""list: The files a Corpus is stored in.
+"""
+
+
+def _hash_words(words):
+    """64 bit hashes of a list of strings, as a uint64 array."""
+
+    digests = b''.join(hashlib.blake2b(word.encode('utf-8'),
+                                       digest_size=8).digest()
+                       for word in words)
+    return np.frombuffer(digests, dtype='<u8')
+
+
+class Corpus:
+    """A read-only wordlist stored as one byte buffer plus offsets.
+
+    The words are stored UTF-8 encoded and back to back in
+    ``words.bin``, and ``offsets.npy`` holds where each word starts. All
+    files are opened memory-mapped, so processes that open the same corpus
+    share its pages, and nothing is read before it's needed. Length
+    filtering and membership tests run on the arrays directly, without
+    creating a Python string per word.
+
+    Words are sorted by a 64 bit hash, so that membership tests are a
+    binary search.
+
+    Parameters
+    ----------
+    directory : str
+        A folder written by :meth:`write`.
+
+    Examples
+    --------
+    ::
+
+        sng.Corpus.write(['alpha', 'beta'], 'my_corpus')
+        corpus = sng.Corpus('my_corpus')
+        corpus.contains(['alpha', 'gamma'])   # array([ True, False])
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+        words_file = os.path.join(directory, 'words.bin')
+        if os.path.getsize(words_file) > 0:
+            self.bytes = np.memmap(words_file, dtype=np.uint8, mode='r')
+        else:
+            # Empty files can't be memory-mapped
+            self.bytes = np.zeros(0, dtype=np.uint8)
+        self.offsets = np.load(os.path.join(directory, 'offsets.npy'),
+                               mmap_mode='r')
+        self.lengths = np.load(os.path.join(directory, 'lengths.npy'),
+                               mmap_mode='r')
+        self.hashes = np.load(os.path.join(directory, 'hashes.npy'),
+                              mmap_mode='r')
+
+    @classmethod
+    def write(cls, words, directory):
+        """Store a list of words.
+
+        Parameters
+        ----------
+        words : list of strings
+            The words, e.g. a Generator's ``wordlist``. Trailing newlines
+            are stripped.
+        directory : str
+            The folder to write to. Will be created if necessary.
+
+        Returns
+        -------
+        sng.Corpus : The opened corpus.
+        """
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        words = [word.rstrip('\n') for word in words]
+        hashes = _hash_words(words)
+        order = np.argsort(hashes, kind='mergesort')
+        words = [words[i] for i in order]
+
+        encoded = [word.encode('utf-8') for word in words]
+        offsets = np.zeros(len(words) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(word) for word in encoded])
+
+        with open(os.path.join(directory, 'words.bin'), 'wb') as f:
+            f.write(b''.join(encoded))
+        np.save(os.path.join(directory, 'offsets.npy'), offsets)
+        np.save(os.path.join(directory, 'lengths.npy'),
+                np.array([len(word) for word in words], dtype=np.int32))
+        np.save(os.path.join(directory, 'hashes.npy'), hashes[order])
+        return cls(directory)
+
+    def copy(self, directory):
+        """Copy the stored words to another folder, leaving out anything
+        else in this one, e.g. cache files.
+
+        Returns
+        -------
+        sng.Corpus : The opened copy.
+        """
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        for name in FILES:
+            shutil.copyfile(os.path.join(self.directory, name),
+                            os.path.join(directory, name))
+        return type(self)(directory)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def _bytes(self, i):
+        return self.bytes[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i):
+        return self._bytes(i).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def with_length(self, min_word_len=0, max_word_len=None):
+        """Find the words within some length bounds.
+
+        Returns
+        -------
+        numpy array : The indices of all words with at least
+            ``min_word_len`` and at most ``max_word_len`` characters.
+        """
+
+        keep = self.lengths >= min_word_len
+        if max_word_len is not None:
+            keep &= self.lengths <= max_word_len
+        return np.flatnonzero(keep)
+
+    def contains(self, words):
+        """Test many words at once.
+
+        Returns
+        -------
+        numpy array : A boolean array, True for the words in the corpus.
+        """
+
+        found = np.zeros(len(words), dtype=bool)
+        if len(words) == 0 or len(self) == 0:
+            return found
+
+        hashes = _hash_words(words)
+        pos = np.searchsorted(self.hashes, hashes)
+        candidates = np.flatnonzero(
+            self.hashes[np.minimum(pos, len(self) - 1)] == hashes)
+        # Compare the actual bytes, in case of hash collisions:
+        for i in candidates:
+            encoded = words[i].encode('utf-8')
+            j = pos[i]
+            while j < len(self) and self.hashes[j] == hashes[i]:
+                if self._bytes(j) == encoded:
+                    found[i] = True
+                    break
+                j += 1
+        return found
+
+    def __contains__(self, word):
+        return bool(self.contains([word])[0])
@@ -1,18 +1,56 @@
 # coding: utf-8
 
 import os
+import json
+import time
+import collections
+import contextlib
+import shutil
+import tempfile
+import functools
+import itertools
 import numpy as np
 import pickle
 
 from .Config import Config
-from .helpers import temp_scale
+from .helpers import read_wordlist_file, iter_wordlist_file, shuffle_stream
+from .helpers import encode_words, previous_char_inputs, one_hot
+from .helpers import length_buckets, process_wordlist, cap_vocabulary
+from .helpers import map_rare_chars
+from .BloomFilter import BloomFilter
+from .Corpus import Corpus
+from .cache import load_corpus, encoded_corpus
+from .sampling import generate_words, collect_words, best_words
+from .sampling import iter_collect_words
+from .sampling import log_likelihood
+from .Sampler import Sampler, _strip_suffix
+from .NGramModel import NGramModel
+from .parallel import make_pool, sample_parallel
 
-import keras
-from keras.preprocessing.text import text_to_word_sequence
-from keras.models import Sequential
-from keras.layers import Dense, Activation
-from keras.layers import LSTM, TimeDistributed  # , SimpleRNN, GRU
-from keras.callbacks import LambdaCallback
+FORMAT_VERSION = 1
+"""int: The version of the folder layout written by :meth:`Generator.save`.
+"""
+
+# Keras is only imported inside the methods that train or run the model.
+# Importing it pulls in TensorFlow, which takes seconds and hundreds of MB,
+# and most users of this module (e.g. wordlist tools) never need it.
+
+
+def _timed(phase):
+    """Decorator that records how long a Generator method takes, see
+    ``Generator.timings``.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._record_time(phase, time.perf_counter() - start)
+        return wrapper
+    return decorator
 
 
 class Generator:
@@ -28,6 +66,12 @@ class Generator:
     wordlist : list of strings
         Alternatively to ``wordlist_file``, you can provide the already
         processed wordlist, a list of (ideally unique) strings.
+    streaming : bool
+        If True, ``wordlist_file`` is never read into memory as a whole.
+        It is read in chunks and deduplicated with a fixed-size
+        :class:`sng.BloomFilter` instead, once to collect the characters
+        and then again in every training epoch. Use this for corpora that
+        are larger than RAM.
 
     Attributes
     ----------
@@ -36,7 +80,28 @@ class Generator:
         at initialization.
     wordlist : list of strings
         A processed list of unique words, each ending in a newline.
-        This is the input to the neural network.
+        This is the input to the neural network. None in streaming mode.
+    corpus : sng.Corpus or None
+        The memory-mapped wordlist of a loaded Generator, or of one whose
+        ``wordlist_file`` was cached. ``wordlist`` is only created from it
+        when it's needed, e.g. to continue training.
+    directory : str or None
+        The folder this Generator was last saved to or loaded from, as long
+        as the model hasn't changed since.
+    model : keras.models.Sequential
+        The trained model. A loaded Generator reads it from disk on first
+        access only, since that requires importing Keras.
+    sampler : sng.Sampler or None
+        The NumPy version of the model. A loaded Generator simulates names
+        with it, without ever importing Keras.
+    timings : dict
+        The wall time in seconds of the last run of every phase:
+        ``'preprocess'`` (reading the corpus in ``__init__``),
+        ``'encode'`` (encoding the corpus in ``fit()``), ``'epoch'``,
+        ``'fit'`` and ``'simulate'``.
+    timing_hooks : list of callables
+        Called as ``hook(phase, seconds)`` whenever a phase ends, e.g. to
+        send the timings to a monitoring system.
 
     Examples
     --------
@@ -60,31 +125,159 @@ class Generator:
         gen.simulate(n=5)
     """
 
-    def __init__(self, config=Config(), wordlist_file=None, wordlist=None):
+    @_timed('preprocess')
+    def __init__(self, config=Config(), wordlist_file=None, wordlist=None,
+                 streaming=False):
+        self._init_state(config, wordlist_file)
+
+        corpus = None
+        if wordlist_file and self.config.use_cache and not streaming:
+            # The processed corpus is cached by the file's contents. The
+            # wordlist is created from it on first access.
+            try:
+                corpus, chars, self.bucket_chars = load_corpus(
+                    wordlist_file, self.config.line_mode,
+                    self.config.max_vocab_size, self.config.rare_buckets)
+            except OSError:
+                # E.g. a read-only cache folder. The cache is optional.
+                pass
+
+        if streaming:
+            self.wordlist = None
+
+            # One pass over the corpus to count the characters and the
+            # unique words. The Bloom filter that deduplicated the words
+            # then serves as the index for simulate(new=True):
+            char_counts = collections.Counter('\n')
+            self.corpus_size = 0
+            self.novelty_index = BloomFilter(self.config.dedup_capacity,
+                                             self.config.dedup_error_rate)
+            for word in self._iter_unique_words(self.novelty_index):
+                char_counts.update(word)
+                self.corpus_size += 1
+            if self.config.max_vocab_size is None:
+                self._set_chars(sorted(char_counts))
+            else:
+                chars, self.bucket_chars = cap_vocabulary(
+                    char_counts, self.config.max_vocab_size,
+                    self.config.rare_buckets)
+                self._set_chars(chars)
+        elif corpus is not None:
+            self.corpus = corpus
+            self.corpus_size = len(corpus)
+            self._set_chars(chars)
+        else:
+            if wordlist_file:
+                wordlist = read_wordlist_file(wordlist_file,
+                                              self.config.line_mode)
+
+            # Keep only unique words, and collect the characters:
+            wordlist, chars, self.bucket_chars = process_wordlist(
+                wordlist, self.config.max_vocab_size,
+                self.config.rare_buckets)
+            # Terminate each word with a newline:
+            self.wordlist = [word + '\n' for word in wordlist]
+            self.corpus_size = len(self.wordlist)
+            self._set_chars(chars)
+
+        if self.config.verbose:
+            print(self.corpus_size, "words\n")
+            print(len(self.chars), "characters, including the \\n:")
+            print(self.chars)
+            if self._wordlist is not None:
+                print("\nFirst two sample words:")
+                print(self._wordlist[:2])
+            elif self.corpus is not None:
+                print("\nFirst two sample words:")
+                print([word + '\n'
+                       for word in itertools.islice(self.corpus, 2)])
+
+    def _init_state(self, config, wordlist_file):
+        """Set the attributes that don't depend on the corpus.
+        """
+
         self.config = config
+        self.wordlist_file = wordlist_file
+        self.wordlist = None
+        self.corpus = None
+        self.bucket_chars = [None] * config.rare_buckets
+        self.debug = {}
+        self.timings = {}
+        self.timing_hooks = []
+        self.directory = None
+        self.model = None
+        self.step_model = None
+        self.sampler = None
+
+    @classmethod
+    def _from_vocabulary(cls, config, chars):
+        """Create a Generator from a known vocabulary, without processing
+        a corpus.
+        """
+
+        generator = cls.__new__(cls)
+        generator._init_state(config, None)
+        generator.corpus_size = None
+        generator._set_chars(chars)
+        return generator
+
+    @property
+    def wordlist(self):
+        # A loaded Generator creates its wordlist on first access only.
+        if self._wordlist is None and self.corpus is not None:
+            self._wordlist = [word + '\n' for word in self.corpus]
+        return self._wordlist
+
+    @wordlist.setter
+    def wordlist(self, wordlist):
+        self._wordlist = wordlist
+        self.corpus = None
+
+    @property
+    def model(self):
+        if self._model is None and self.directory is not None:
+            model_file = os.path.join(self.directory, 'model.h5')
+            if os.path.exists(model_file):
+                import keras
+                self._model = keras.models.load_model(model_file)
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def to_sampler(self):
+        """Get a :class:`sng.Sampler` for the current model.
+
+        Returns
+        -------
+        sng.Sampler : The NumPy version of the model.
+        """
 
-        if wordlist_file:
-            # text_to_word_sequence only splits by space, not newline.
-            # Make all word separators spaces:
-            contents = open(wordlist_file).read().replace('\n', ' ')
-            wordlist = text_to_word_sequence(
-                contents,
-                filters='!"#$%&()*+,-./:;<=>?@[\]^_`{|}~0123456789–…\'\"’«·»'
-            )
-
-        # Keep only unique words:
-        self.wordlist = list(set(wordlist))
-        # Terminate each word with a newline:
-        self.wordlist = [word.strip() + '\n' for word in self.wordlist]
-
-        # Generate the set of unique characters (including newline)
-        # https://stackoverflow.com/questions/952914/making-a-flat-list-out-of-list-of-lists-in-python
-        self.chars = sorted(list(set(
-            [char for word in self.wordlist for char in word]
-        )))
+        if self.sampler is None:
+            self.sampler = Sampler.from_model(self.model, self.chars,
+                                              self.config)
+        return self.sampler
 
+    def _has_wordlist(self):
+        """Whether the corpus is in memory or memory-mapped, i.e. not
+        streamed from ``wordlist_file``. Unlike ``self.wordlist``, this
+        doesn't create the wordlist from a :class:`sng.Corpus`.
+        """
+
+        return self._wordlist is not None or self.corpus is not None
+
+    def _record_time(self, phase, seconds):
+        self.timings[phase] = seconds
+        for hook in self.timing_hooks:
+            hook(phase, seconds)
+
+    def _set_chars(self, chars):
+        """Set the character vocabulary and the lookup tables.
+        """
+
+        self.chars = chars
         self.vocab_size = len(self.chars)
-        self.corpus_size = len(self.wordlist)
 
         self.ix_to_char = {
             ix: char for ix, char in enumerate(self.chars)
@@ -93,63 +286,393 @@ class Generator:
             char: ix for ix, char in enumerate(self.chars)
         }
 
-        if self.config.verbose:
-            print(self.corpus_size, "words\n")
-            print(len(self.chars), "characters, including the \\n:")
-            print(self.chars)
-            print("\nFirst two sample words:")
-            print(self.wordlist[:2])
-
-    def fit(self):
-        """Fit the model. Adds the 'model' attribute to itself.
-        """
-
-        X = np.zeros((self.corpus_size,
-                      self.config.max_word_len,
-                      self.vocab_size))
-        Y = np.zeros((self.corpus_size,
-                      self.config.max_word_len,
-                      self.vocab_size))
-        for word_i in range(self.corpus_size):
-            word = self.wordlist[word_i]
-            chars = list(word)
-
-            for char_j in range(min(len(word), self.config.max_word_len)):
-                char = chars[char_j]
-                char_ix = self.char_to_ix[char]
-                X[word_i, char_j, char_ix] = 1
-                if char_j > 0:
-                    # the 'next char' at time point char_j
-                    Y[word_i, char_j - 1, char_ix] = 1
+    def _iter_unique_words(self, seen=None):
+        """Stream the unique words of ``wordlist_file``, each ending in a
+        newline. Duplicates are detected with a Bloom filter, so a few
+        rare words may be dropped as false positives.
 
-        model = Sequential()
-        model.add(LSTM(self.config.hidden_dim,
-                       input_shape=(None, self.vocab_size),
-                       return_sequences=True))
-        for i in range(self.config.n_layers - 1):
-            model.add(LSTM(self.config.hidden_dim, return_sequences=True))
-        model.add(TimeDistributed(Dense(self.vocab_size)))
-        model.add(Activation('softmax'))
-        model.compile(loss="categorical_crossentropy", optimizer="rmsprop")
+        Parameters
+        ----------
+        seen : sng.BloomFilter, optional
+            An empty filter to record the words in. If None, a new one is
+            created.
+        """
+
+        if seen is None:
+            seen = BloomFilter(self.config.dedup_capacity,
+                               self.config.dedup_error_rate)
+        for word in iter_wordlist_file(self.wordlist_file,
+                                       self.config.chunk_size,
+                                       self.config.line_mode):
+            word = word.strip()
+            if seen.add(word):
+                yield self._map_chars([word])[0] + '\n'
+
+    def _map_chars(self, words):
+        """Replace rare characters by their bucket's representative, see
+        ``config.max_vocab_size``.
+        """
+
+        if all(char is None for char in self.bucket_chars):
+            return list(words)
+        return map_rare_chars(words, self.chars, self.bucket_chars)
+
+    def _is_known(self, words):
+        """Check which words appear in the training corpus.
+
+        Parameters
+        ----------
+        words : list of strings
+            Simulated words, without suffix.
+
+        Returns
+        -------
+        numpy array : A boolean array, True for the words in the corpus.
+        """
+
+        if not hasattr(self, 'novelty_index'):
+            if self.corpus is not None:
+                # Look words up in the memory-mapped store directly
+                self.novelty_index = self.corpus
+            elif self._wordlist is not None:
+                self.novelty_index = self._novelty_set()
+            else:
+                raise ValueError('There is no wordlist to check the names '
+                                 'against. Save the generator with '
+                                 'include_wordlist=True to use new=True '
+                                 'after loading it.')
+
+        lowered = [word.lower() for word in words]
+        if isinstance(self.novelty_index, set):
+            return np.array([word in self.novelty_index for word in lowered],
+                            dtype=bool)
+        known = self.novelty_index.contains(lowered)
+        if self.config.line_mode:
+            # These indexes keep the case of the names
+            known |= self.novelty_index.contains(words)
+        return known
+
+    def _novelty_set(self):
+        """A set of the lowercased training words. A set is exact and
+        fast, and costs about as much memory as the wordlist itself.
+        """
+
+        words = self._wordlist if self._wordlist is not None else self.corpus
+        return set(word.strip().lower() for word in words)
+
+    def _stream_batches(self):
+        """Endlessly yield training batches from ``wordlist_file``, one
+        pass over the file per epoch. Every batch is padded to its own
+        longest word.
+        """
+
+        while True:
+            words = shuffle_stream(self._iter_unique_words(),
+                                   self.config.shuffle_buffer)
+            batch = []
+            for word in words:
+                batch.append(word)
+                if len(batch) == self.config.batch_size:
+                    yield self._encode(batch)
+                    batch = []
+            if batch:
+                yield self._encode(batch)
+
+    def _bucketed_batches(self, seqs):
+        """Endlessly yield training batches of words of similar length,
+        one pass over ``seqs`` per epoch, see
+        :func:`sng.helpers.length_buckets`.
+
+        Parameters
+        ----------
+        seqs : numpy array
+            All words, as encoded by :func:`sng.helpers.encode_words`.
+        """
+
+        if len(seqs) == 0:
+            raise ValueError('There are no words to make batches of.')
+        lengths = np.sum(seqs >= 0, axis=1)
+        while True:
+            for batch in length_buckets(lengths, self.config.batch_size):
+                # Cut off the columns that are padding in the whole batch:
+                yield self._encode(
+                    None, np.asarray(seqs[batch, :np.max(lengths[batch])]))
+
+    @_timed('encode')
+    def _encode_corpus(self):
+        """Encode the whole corpus with :func:`sng.helpers.encode_words`,
+        padded to its longest word. A :class:`sng.Corpus` is encoded once
+        and then read from the cache, see :func:`sng.cache.encoded_corpus`.
+        """
+
+        if self.corpus is not None and self.config.use_cache:
+            return encoded_corpus(self.corpus, self.chars,
+                                  int(np.max(self.corpus.lengths)) + 1)
+        return encode_words(self.wordlist, self.char_to_ix,
+                            max(len(word) for word in self.wordlist))
+
+    def _encode(self, wordlist, seqs=None):
+        """Encode words as network inputs, sparse next-character targets,
+        and temporal sample weights. Pass ``seqs`` if the words are already
+        encoded with :func:`sng.helpers.encode_words`.
+
+        The words are padded to the longest one, and never truncated.
+        """
+
+        if seqs is None:
+            seqs = encode_words(wordlist, self.char_to_ix,
+                                max(len(word) for word in wordlist))
+        # The targets are the characters themselves, as sparse integer
+        # indices. Padded positions have a sample weight of zero:
+        Y = np.maximum(seqs, 0)[:, :, np.newaxis]
+        sample_weight = (seqs >= 0).astype(np.float32)
+
+        # The inputs are the previous characters, starting with -1 like the
+        # decoders in sng.sampling do:
+        inputs = previous_char_inputs(seqs)
+        if self.config.embedding_dim:
+            # Index 0 is the padding and start-of-word input:
+            X = inputs + 1
+        else:
+            X = one_hot(inputs, self.vocab_size)
+        return X, Y, sample_weight
+
+    @_timed('fit')
+    def fit(self, checkpoint_dir=None, resume_from=None):
+        """Fit the model. Adds the 'model' attribute to itself, or the
+        'sampler' attribute if ``config.backend`` is ``'ngram'``.
+
+        Parameters
+        ----------
+        checkpoint_dir : str or None
+            If set, the Generator is saved into this folder every
+            ``config.checkpoint_every`` epochs, and after the last one. It
+            can be loaded with :meth:`load` like any saved Generator.
+        resume_from : str or None
+            A ``checkpoint_dir`` of an interrupted run. Training continues
+            after its last epoch, with the weights and the optimizer state
+            stored there.
+        """
+
+        if self.config.backend == 'ngram':
+            return self._fit_ngram()
+        if self.config.backend != 'lstm':
+            raise ValueError('Unknown backend: ' + repr(self.config.backend))
+
+        from keras.callbacks import LambdaCallback, EarlyStopping
+        from keras.callbacks import LearningRateScheduler
+
+        assert self._has_wordlist() or self.wordlist_file, \
+            'This Generator has no corpus to train on.'
+        if self.corpus_size == 0:
+            raise ValueError('The corpus has no words to train on.')
+
+        initial_epoch = 0
+        if resume_from is not None:
+            import keras
+            if not os.path.exists(resume_from):
+                # Interrupted while replacing the checkpoint:
+                resume_from = resume_from.rstrip(os.sep) + '.old'
+            model = keras.models.load_model(
+                os.path.join(resume_from, 'model.h5'))
+            with open(os.path.join(resume_from, 'training.json')) as f:
+                initial_epoch = json.load(f)['epoch']
+        else:
+            model = self._build_model()
+
+        epoch_start = []
+
+        def on_epoch_begin(epoch, logs):
+            epoch_start.append(time.perf_counter())
 
         # TODO how to move this function into helpers.py?
         def on_epoch_end(epoch, logs):
+            self._record_time('epoch', time.perf_counter() - epoch_start[-1])
             if epoch % 10 == 0 and self.config.verbose:
                 print("epoch " + str(epoch) + " words: ", end="")
-                for _ in range(4):
-                    word = self._generate_word(model)
+                decoder = self._decoder(self._build_step_model(model))
+                for word in self._generate_words(decoder, 4):
                     print(word + ", ", end="")
 
-                print("loss: " + str(np.round(logs['loss'], 4)))
+                print("loss: " + str(np.round(logs['loss'], 4)), end="")
+                if 'val_loss' in logs:
+                    print(", val_loss: " + str(np.round(logs['val_loss'],
+                                                        4)), end="")
+                print()
+            if checkpoint_dir is not None and \
+                    (epoch + 1) % self.config.checkpoint_every == 0:
+                self._checkpoint(model, checkpoint_dir, epoch + 1)
+
+        callbacks = [
+            LambdaCallback(on_epoch_begin=on_epoch_begin,
+                           on_epoch_end=on_epoch_end),
+            LearningRateScheduler(self._learning_rate),
+        ]
+        seqs = None
+        validation = {}
+        if self._has_wordlist():
+            seqs = self._encode_corpus()
+
+            # A small corpus may have too few words to hold any out:
+            n_val = int(len(seqs) * self.config.validation_split)
+            if 0 < n_val < len(seqs):
+                # Always the same split, also when resuming:
+                order = np.random.RandomState(0).permutation(len(seqs))
+                validation = {
+                    'validation_data': self._bucketed_batches(
+                        seqs[np.sort(order[:n_val])]),
+                    'validation_steps': int(np.ceil(
+                        n_val / self.config.batch_size)),
+                }
+                seqs = seqs[np.sort(order[n_val:])]
+
+        if self.config.early_stopping_patience is not None:
+            callbacks.append(EarlyStopping(
+                monitor='val_loss' if validation else 'loss',
+                patience=self.config.early_stopping_patience,
+                restore_best_weights=True))
+
+        if seqs is None:
+            steps = int(np.ceil(self.corpus_size / self.config.batch_size))
+            history = model.fit_generator(
+                self._stream_batches(), steps_per_epoch=steps, verbose=0,
+                epochs=self.config.epochs, initial_epoch=initial_epoch,
+                callbacks=callbacks)
+        else:
+            # The words are batched by length, so that little time is
+            # spent on padding. Each batch is one-hot encoded on the fly.
+            steps = int(np.ceil(len(seqs) / self.config.batch_size))
+            history = model.fit_generator(
+                self._bucketed_batches(seqs), steps_per_epoch=steps,
+                verbose=0, epochs=self.config.epochs,
+                initial_epoch=initial_epoch, callbacks=callbacks,
+                **validation)
+
+        if self.config.debug:
+            self.debug['history'] = history.history
+
+        self.model = model
+        self.step_model = self._build_step_model(model)
+        # The model changed, so any saved copy is outdated:
+        self.sampler = None
+        self.directory = None
+        if checkpoint_dir is not None:
+            self._checkpoint(model, checkpoint_dir,
+                             initial_epoch + len(history.epoch))
+
+    def _build_model(self):
+        """Build and compile a new Keras model.
+        """
+
+        from keras.models import Sequential
+        from keras.layers import Dense, Activation, Embedding
+        from keras.layers import LSTM, TimeDistributed  # , SimpleRNN, GRU
+        from keras.optimizers import RMSprop
 
-        print_callback = LambdaCallback(on_epoch_end=on_epoch_end)
-        model.fit(X, Y, batch_size=self.config.batch_size, verbose=0,
-                  epochs=self.config.epochs, callbacks=[print_callback])
+        model = Sequential()
+        if self.config.embedding_dim:
+            model.add(Embedding(self.vocab_size + 1,
+                                self.config.embedding_dim,
+                                input_shape=(None,)))
+            model.add(LSTM(self.config.hidden_dim, return_sequences=True))
+        else:
+            model.add(LSTM(self.config.hidden_dim,
+                           input_shape=(None, self.vocab_size),
+                           return_sequences=True))
+        for i in range(self.config.n_layers - 1):
+            model.add(LSTM(self.config.hidden_dim, return_sequences=True))
+        model.add(TimeDistributed(Dense(self.vocab_size)))
+        model.add(Activation('softmax'))
+        model.compile(loss="sparse_categorical_crossentropy",
+                      optimizer=RMSprop(lr=self.config.learning_rate),
+                      sample_weight_mode="temporal")
+        return model
+
+    def _learning_rate(self, epoch):
+        """The learning rate of an epoch, according to
+        ``config.lr_schedule``.
+        """
+
+        rate = self.config.learning_rate
+        for start, scheduled in sorted(self.config.lr_schedule or []):
+            if epoch >= start:
+                rate = scheduled
+        return rate
+
+    def _checkpoint(self, model, directory, epoch):
+        """Save the model during training, along with the number of
+        finished epochs.
+
+        The checkpoint is written next to ``directory`` first. The
+        previous one is then moved aside to ``<directory>.old`` and only
+        deleted once the new one is in place, so that an interruption never
+        leaves no complete checkpoint. ``fit(resume_from=directory)`` falls
+        back to the ``.old`` one if necessary.
+        """
 
         self.model = model
+        self.sampler = None
+        tmp = directory.rstrip(os.sep) + '.tmp'
+        old = directory.rstrip(os.sep) + '.old'
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        self.save(tmp)
+        with open(os.path.join(tmp, 'training.json'), 'w') as f:
+            json.dump({'epoch': epoch}, f)
+        if os.path.exists(directory):
+            if os.path.exists(old):
+                shutil.rmtree(old)
+            os.rename(directory, old)
+        os.rename(tmp, directory)
+        if os.path.exists(old):
+            shutil.rmtree(old)
+        self.directory = directory
+
+    def _fit_ngram(self):
+        """Count the corpus' n-grams into an :class:`sng.NGramModel`.
+        """
 
+        assert self._has_wordlist() or self.wordlist_file, \
+            'This Generator has no corpus to train on.'
+
+        def encode(batch):
+            # Pad to the longest word, so that no ending is cut off:
+            return encode_words(batch, self.char_to_ix,
+                                max(len(word) for word in batch))
+
+        def batches(words):
+            batch = []
+            for word in words:
+                batch.append(word)
+                if len(batch) == 10000:
+                    yield encode(batch)
+                    batch = []
+            if batch:
+                yield encode(batch)
+
+        if self._wordlist is not None:
+            words = self._wordlist
+        elif self.corpus is not None:
+            words = (word + '\n' for word in self.corpus)
+        else:
+            # Streaming mode: a single pass over the file
+            words = self._iter_unique_words()
+
+        self.sampler = NGramModel.fit(batches(words), self.chars,
+                                      self.config)
+        if self.config.verbose:
+            print("Counted the n-grams of", self.corpus_size, "words.")
+
+        self.model = None
+        self.step_model = None
+        # The model changed, so any saved copy is outdated:
+        self.directory = None
+
+    @_timed('simulate')
     def simulate(self, n=10, temperature=None, min_word_len=None,
-                 max_word_len=None):
+                 max_word_len=None, new=False, unique=False, startswith='',
+                 endswith='', banned_chars='', top_k=None, top_p=None,
+                 workers=1, seed=None):
         """Use the trained model to simulate a few name suggestions.
 
         Parameters
@@ -167,22 +690,343 @@ class Generator:
         max_word_len : int or None
             Maximum word length of the simulated names.
             If None, will use the value specified in self.config.
+        new : bool
+            If True, only return names that do not appear in the training
+            corpus.
+        unique : bool
+            If True, return ``n`` distinct names.
+        startswith : str
+            Every name starts with these characters.
+        endswith : str
+            Every name ends with these characters (before
+            ``config.suffix``). They count towards the word length.
+        banned_chars : str
+            Characters that must not appear in the names.
+        top_k : int or None
+            Only sample from the ``top_k`` most likely characters at every
+            position. If None, will use the value specified in self.config.
+        top_p : float or None
+            Only sample from the most likely characters whose total
+            probability is at least ``top_p``. If None, will use the value
+            specified in self.config.
+        workers : int
+            If larger than 1, split the sampling across this many
+            processes. Each of them loads the model once, from the folder
+            this Generator was last saved to or loaded from, or else from a
+            temporary export.
+        seed : int or None
+            Seed for reproducible results. With several workers, every
+            worker gets its own random stream derived from this seed.
+
+        If ``new`` or ``unique`` is set, words are sampled in batches until
+        there are ``n`` acceptable ones. Every batch is oversampled by the
+        rejection rate observed so far. If the model can't produce enough
+        distinct or new names, fewer than ``n`` names are returned. The
+        fractions of rejected words are stored in ``self.debug`` if
+        ``config.debug`` is set.
+        """
+
+        assert self.step_model is not None or self.sampler is not None, \
+            'Call the fit() method first!'
+
+        options = self._simulation_options(
+            temperature=temperature, min_word_len=min_word_len,
+            max_word_len=max_word_len, startswith=startswith,
+            endswith=endswith, banned_chars=banned_chars, top_k=top_k,
+            top_p=top_p)
+        random_state = None if seed is None else np.random.RandomState(seed)
+
+        with self._sampling(workers, random_state, options) as sample:
+            if not new and not unique:
+                return [word + self.config.suffix for word in sample(n)]
+
+            words, stats = collect_words(
+                sample, n, unique=unique,
+                is_known=self._is_known if new else None)
+
+        # Nothing is sampled if n is 0:
+        n_sampled = max(stats['n_sampled'], 1)
+        known_rate = stats['n_known'] / n_sampled
+        duplicate_rate = stats['n_duplicates'] / n_sampled
+        if self.config.debug:
+            self.debug['rejection_rate'] = known_rate
+            self.debug['duplicate_rate'] = duplicate_rate
+        if self.config.verbose:
+            if new:
+                print("Rejected " + str(np.round(100 * known_rate, 1)) +
+                      "% of the simulated words as already in the corpus.")
+            if unique:
+                print("Rejected " + str(np.round(100 * duplicate_rate, 1)) +
+                      "% of the simulated words as duplicates.")
+        if stats['exhausted']:
+            print("Only found " + str(len(words)) + " acceptable words in " +
+                  str(stats['n_sampled']) + " tries. This seems to be all "
+                  "the model can produce. Try a higher temperature or "
+                  "different word lengths.")
+
+        return [word + self.config.suffix for word in words]
+
+    def iter_simulate(self, n=None, batch_size=10000, temperature=None,
+                      min_word_len=None, max_word_len=None, new=False,
+                      unique=False, startswith='', endswith='',
+                      banned_chars='', top_k=None, top_p=None, workers=1,
+                      seed=None):
+        """Simulate name suggestions in batches, without keeping them.
+
+        Unlike :meth:`simulate`, this yields every batch as soon as it is
+        sampled, so millions of names can be written to a file in constant
+        memory::
+
+            with open('names.txt', 'w') as f:
+                for names in gen.iter_simulate(10**7, unique=True):
+                    f.write('\\n'.join(names) + '\\n')
+
+        Parameters
+        ----------
+        n : int or None
+            The total number of names. If None, names are yielded until
+            the caller stops.
+        batch_size : int
+            The number of names per batch. The last batch may be smaller.
+        unique : bool
+            If True, never yield a name twice (ignoring case). The names
+            that were yielded are tracked in a :class:`sng.BloomFilter`
+            with room for ``n`` names (or ``config.dedup_capacity``), so a
+            small share of distinct names is rejected as false positives.
+
+        All other parameters are as in :meth:`simulate`. If ``new`` or
+        ``unique`` is set and the model can't produce any more acceptable
+        names, the iteration stops early.
+
+        Yields
+        ------
+        list : A batch of names.
+        """
+
+        assert self.step_model is not None or self.sampler is not None, \
+            'Call the fit() method first!'
+
+        options = self._simulation_options(
+            temperature=temperature, min_word_len=min_word_len,
+            max_word_len=max_word_len, startswith=startswith,
+            endswith=endswith, banned_chars=banned_chars, top_k=top_k,
+            top_p=top_p)
+        random_state = None if seed is None else np.random.RandomState(seed)
+
+        if unique:
+            seen = BloomFilter(n or self.config.dedup_capacity,
+                               self.config.dedup_error_rate)
+        else:
+            seen = None
+
+        with self._sampling(workers, random_state, options) as sample:
+            if not new and not unique:
+                n_done = 0
+                while n is None or n_done < n:
+                    size = batch_size if n is None else min(batch_size,
+                                                            n - n_done)
+                    n_done += size
+                    yield [word + self.config.suffix
+                           for word in sample(size)]
+                return
+
+            for words in iter_collect_words(
+                    sample, n, batch_size, unique=unique,
+                    is_known=self._is_known if new else None, seen=seen):
+                yield [word + self.config.suffix for word in words]
+
+    def _simulation_options(self, **options):
+        """The keyword arguments for :func:`sng.sampling.generate_words`,
+        where the ones that are None default to the values in
+        ``self.config``.
+        """
+
+        for key in ['temperature', 'min_word_len', 'max_word_len', 'top_k',
+                    'top_p']:
+            if options.get(key) is None:
+                options[key] = getattr(self.config, key)
+        return options
+
+    @contextlib.contextmanager
+    def _sampling(self, workers, random_state, options):
+        """Context that provides a function ``sample(size)``, which samples
+        that many words with the given options.
+
+        With several workers, the sampling is split across a process pool
+        that lives as long as the context. Each process loads the model
+        once, from the folder this Generator was last saved to or loaded
+        from, or else from a temporary export.
+        """
+
+        if workers <= 1:
+            decoder = self._decoder()
+
+            def sample(size):
+                return self._generate_words(decoder, size,
+                                            random_state=random_state,
+                                            **options)
+            yield sample
+            return
+
+        directory = self.directory
+        tmpdir = None
+        # Folders in the old pickle layout have no arrays to load:
+        if directory is None or not os.path.exists(
+                os.path.join(directory, 'inference', 'meta.json')):
+            tmpdir = tempfile.mkdtemp()
+            directory = tmpdir
+            self.to_sampler().save(directory)
+        pool = make_pool(directory, workers)
+
+        def sample(size):
+            return sample_parallel(pool, size, workers, random_state,
+                                   **options)
+        try:
+            yield sample
+        finally:
+            pool.close()
+            pool.join()
+            if tmpdir is not None:
+                shutil.rmtree(tmpdir)
+
+    def best_names(self, n=10, min_word_len=None, max_word_len=None,
+                   startswith='', banned_chars='', beam_width=None):
+        """Find the most likely names under the trained model.
+
+        Instead of sampling, this runs a beam search over the model (see
+        :func:`sng.sampling.best_words`), so e.g. the 100 most likely names
+        of 6 to 9 characters can be found without sampling and ranking
+        thousands of them::
+
+            gen.best_names(100, min_word_len=6, max_word_len=9)
+
+        Parameters
+        ----------
+        n : int
+            The number of names to find.
+        min_word_len : int or None
+            Minimum word length of the names.
+            If None, will use the value specified in self.config.
+        max_word_len : int or None
+            Maximum word length of the names.
+            If None, will use the value specified in self.config.
+        startswith : str
+            Every name starts with these characters.
+        banned_chars : str
+            Characters that must not appear in the names.
+        beam_width : int or None
+            The number of partial names to keep at every position.
+            Defaults to ``n``. Wider beams find likelier names, at a
+            higher cost.
+
+        Returns
+        -------
+        list : Up to ``n`` tuples of a name and its log probability, the
+            most likely name first.
+        """
+
+        if min_word_len is None:
+            min_word_len = self.config.min_word_len
+        if max_word_len is None:
+            max_word_len = self.config.max_word_len
+
+        assert self.step_model is not None or self.sampler is not None, \
+            'Call the fit() method first!'
+
+        words = best_words(self._decoder(), n, self.ix_to_char,
+                           min_word_len=min_word_len,
+                           max_word_len=max_word_len, startswith=startswith,
+                           banned_chars=banned_chars, beam_width=beam_width)
+        return [(word + self.config.suffix, score) for word, score in words]
+
+    def log_likelihood(self, names):
+        """Compute the log probability of every name under the trained
+        model, in one batch (see :func:`sng.sampling.log_likelihood`).
+        To rank long candidate lists, see :meth:`score`.
+
+        Parameters
+        ----------
+        names : list of strings
+            The names to score. Line breaks and a trailing
+            ``config.suffix`` are ignored, and rare characters are mapped
+            as in training.
+
+        Returns
+        -------
+        numpy array : The log probabilities, including the end of the
+            name. Names with characters that are not in the vocabulary get
+            ``-inf``.
         """
 
-        temperature = temperature or self.config.temperature
-        min_word_len = min_word_len or self.config.min_word_len
-        max_word_len = max_word_len or self.config.max_word_len
+        assert self.step_model is not None or self.sampler is not None, \
+            'Call the fit() method first!'
 
-        assert hasattr(self, 'model'), 'Call the fit() method first!'
-        words = []
-        for i in range(n):
-            word = self._generate_word(self.model)
-            words.append(word + self.config.suffix)
-        return words
+        return log_likelihood(self._decoder(), self._prepare_names(names),
+                              self.char_to_ix)
 
-    def save(self, directory, overwrite=False):
+    def score(self, names, batch_size=1024):
+        """Score candidate names by how well they fit the training corpus.
+
+        The score of a name is its average log probability per character,
+        including the end of the name, so that short and long names can be
+        compared. The names are read and scored in batches of
+        ``batch_size``, and the scores are yielded as they are computed,
+        so arbitrarily long candidate lists can be scored in constant
+        memory::
+
+            with open('candidates.txt') as f:
+                for name, score in zip(names, gen.score(f)):
+                    ...
+
+        Parameters
+        ----------
+        names : iterable of strings
+            The names to score, e.g. a list or an open file. Line breaks
+            and a trailing ``config.suffix`` are ignored.
+        batch_size : int
+            The number of names to run through the model at once.
+
+        Yields
+        ------
+        float : The score of every name, in order. Names with characters
+            that are not in the vocabulary get ``-inf``.
+        """
+
+        assert self.step_model is not None or self.sampler is not None, \
+            'Call the fit() method first!'
+
+        decoder = self._decoder()
+        names = iter(names)
+        while True:
+            words = self._prepare_names(itertools.islice(names, batch_size))
+            if not words:
+                return
+            scores = log_likelihood(decoder, words, self.char_to_ix)
+            lengths = np.array([len(word) + 1 for word in words])
+            for score in scores / lengths:
+                yield float(score)
+
+    def _prepare_names(self, names):
+        """Undo the formatting of simulated names, i.e. remove line breaks,
+        the suffix and the capitalization, and map rare characters as in
+        training.
+        """
+
+        words = [name.rstrip('\r\n') for name in names]
+        words = _strip_suffix(words, self.config.suffix)
+        if not self.config.line_mode:
+            # Word corpora are lowercased:
+            words = [word.lower() for word in words]
+        return self._map_chars(words)
+
+    def save(self, directory, overwrite=False, include_wordlist=True):
         """Save the model into a folder.
 
+        The folder holds a ``manifest.json`` with the format version,
+        config and vocabulary, the Keras model, the weights as plain
+        NumPy arrays for :class:`sng.Sampler`, and the wordlist as a
+        memory-mapped :class:`sng.Corpus`.
+
         Parameters
         ----------
         directory : str
@@ -190,8 +1034,14 @@ class Generator:
         overwrite : bool
             If True, the folder contents will be overwritten if it already
             exists. Not recommended, though.
+        include_wordlist : bool
+            If True, also store the wordlist. It's only needed to continue
+            training. Without it, a set of the words is stored instead,
+            for ``simulate(new=True)``.
         """
 
+        from . import __version__
+
         if not overwrite:
             assert not os.path.exists(directory), 'Directory already ' + \
                 'exists! Please choose a non-existing path.'
@@ -199,82 +1049,217 @@ class Generator:
         if not os.path.exists(directory):
             os.makedirs(directory)
 
-        pickle.dump(self.config,
-                    open(os.path.join(directory, 'config.pkl'),
-                         "wb"), pickle.HIGHEST_PROTOCOL)
-        pickle.dump(self.wordlist,
-                    open(os.path.join(directory, 'wordlist.pkl'),
-                         "wb"), pickle.HIGHEST_PROTOCOL)
-        self.model.save(os.path.join(directory, 'model.h5'))
+        has_wordlist = include_wordlist and self._has_wordlist()
+        manifest = {
+            'format': 'sng',
+            'format_version': FORMAT_VERSION,
+            'sng_version': __version__,
+            'config': self.config.to_dict(),
+            'chars': self.chars,
+            'bucket_chars': self.bucket_chars,
+            'corpus_size': self.corpus_size,
+            'wordlist_file': self.wordlist_file,
+            'has_corpus': has_wordlist,
+        }
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if self._wordlist is not None and has_wordlist:
+            Corpus.write(self._wordlist, os.path.join(directory, 'corpus'))
+        elif has_wordlist:
+            # Memory-mapped corpora are copied as they are
+            self.corpus.copy(os.path.join(directory, 'corpus'))
+        if self.model is not None:
+            # The n-gram backend has no Keras model
+            self.model.save(os.path.join(directory, 'model.h5'))
+        # The corpus doubles as the novelty index, so only a Bloom filter
+        # (streaming mode) or an index without wordlist needs storing:
+        novelty_index = getattr(self, 'novelty_index', None)
+        if not has_wordlist and (
+                self._wordlist is not None or self.corpus is not None) and \
+                not isinstance(novelty_index, (set, BloomFilter)):
+            # Keep simulate(new=True) working after loading
+            novelty_index = self._novelty_set()
+        if novelty_index is not None and not (
+                has_wordlist and not isinstance(novelty_index,
+                                                BloomFilter)):
+            pickle.dump(novelty_index,
+                        open(os.path.join(directory, 'novelty.pkl'),
+                             "wb"), pickle.HIGHEST_PROTOCOL)
+
+        # Plain NumPy arrays for the Keras-free sng.Sampler:
+        self.to_sampler().save(os.path.join(directory, 'inference'))
+        self.directory = directory
 
     @classmethod
-    def load(cls, directory):
+    def load(cls, directory, mmap_mode=None):
         """Create a Generator object from a stored folder.
 
+        This reads neither the wordlist nor the Keras model. Names are
+        simulated with the NumPy weights, novelty is checked against the
+        memory-mapped corpus, and the other files are only read when
+        they're needed, e.g. to continue training. Processes that load the
+        same folder share the corpus pages.
+
         Arguments
         ---------
         directory : str
             Folder where you used Generator.save() to store the contents in.
+        mmap_mode : str or None
+            If ``'r'``, the NumPy weights are memory-mapped, like the
+            corpus, instead of read. See :meth:`sng.Sampler.load`.
+        """
+
+        manifest_file = os.path.join(directory, 'manifest.json')
+        if not os.path.exists(manifest_file):
+            return cls._load_pickled(directory)
+
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+        if manifest['format_version'] > FORMAT_VERSION:
+            raise ValueError('The folder ' + directory + ' was saved by a '
+                             'newer version of sng (' +
+                             manifest['sng_version'] + '). Please upgrade.')
+
+        generator = cls._from_vocabulary(Config(**manifest['config']),
+                                         manifest['chars'])
+        generator.corpus_size = manifest['corpus_size']
+        generator.bucket_chars = manifest['bucket_chars']
+        generator.wordlist_file = manifest['wordlist_file']
+        if manifest['has_corpus']:
+            generator.corpus = Corpus(os.path.join(directory, 'corpus'))
+
+        novelty_file = os.path.join(directory, 'novelty.pkl')
+        if os.path.exists(novelty_file):
+            generator.novelty_index = pickle.load(open(novelty_file, 'rb'))
+        generator.sampler = Sampler.load(directory, mmap_mode)
+        generator.directory = directory
+        return generator
+
+    @classmethod
+    def _load_pickled(cls, directory):
+        """Load a folder saved by sng 0.3, which pickled the config and
+        the whole wordlist.
         """
 
         config = pickle.load(
             open(os.path.join(directory, 'config.pkl'), 'rb'))
         wordlist = pickle.load(
             open(os.path.join(directory, 'wordlist.pkl'), 'rb'))
-        model = keras.models.load_model(os.path.join(directory, 'model.h5'))
         generator = cls(config=config, wordlist=wordlist)
-        generator.model = model
+        generator.directory = directory
+        generator.step_model = generator._build_step_model(generator.model)
         return generator
 
-    def _generate_word(self, model):
-
-        X = np.zeros((1, self.config.max_word_len, self.vocab_size))
-
-        # sample the first character
-        initial_char_distribution = temp_scale(
-            model.predict(X[:, 0:1, :]).flatten(), self.config.temperature
-        )
-
-        ix = 0
-
-        # make sure the initial character is not a newline (i.e. index 0)
-        while ix == 0:
-            ix = int(np.random.choice(self.vocab_size, size=1,
-                                      p=initial_char_distribution))
-
-        X[0, 0, ix] = 1
-
-        # start with first character, then later successively append chars
-        generated_word = [self.ix_to_char[ix].upper()]
-
-        # sample all remaining characters
-        for i in range(1, self.config.max_word_len):
-            next_char_distribution = temp_scale(
-                model.predict(X[:, 0:i, :])[:, i-1, :].flatten(),
-                self.config.temperature
-            )
-
-            ix_choice = np.random.choice(
-                self.vocab_size, size=1, p=next_char_distribution
-            )
-
-            ctr = 0
-            while ix_choice == 0 and i < self.config.min_word_len:
-                ctr += 1
-                # sample again if you picked the end-of-word token too early
-                ix_choice = np.random.choice(
-                    self.vocab_size, size=1, p=next_char_distribution
-                )
-                if ctr > 1000:
-                    print("caught in a near-infinite loop."
-                          "You might have picked too low a temperature "
-                          "and the sampler just keeps sampling \\n's")
-                    break
-
-            next_ix = int(ix_choice)
-            X[0, i, next_ix] = 1
-            if next_ix == 0:
-                break
-            generated_word.append(self.ix_to_char[next_ix])
-
-        return ('').join(generated_word)
+    def _build_step_model(self, model):
+        """Build a single-step inference copy of a trained model.
+
+        The copy takes one character per word plus the hidden and cell
+        state of every LSTM layer, and returns the next-character
+        distribution plus the updated states. Sampling then costs one
+        recurrent step per character instead of re-running the LSTMs over
+        the whole prefix. Since the states are explicit inputs, the copy
+        works for any batch size.
+
+        Parameters
+        ----------
+        model : keras.models.Sequential
+            A model as built by :meth:`fit`.
+
+        Returns
+        -------
+        keras.models.Model : The step model.
+        """
+
+        from keras.models import Model
+        from keras.layers import Input, LSTM
+
+        if self.config.embedding_dim:
+            x = Input(shape=(1,))
+        else:
+            x = Input(shape=(1, self.vocab_size))
+        h = x
+        state_inputs = []
+        state_outputs = []
+        for layer in model.layers:
+            if isinstance(layer, LSTM):
+                layer_config = layer.get_config()
+                for key in ['name', 'batch_input_shape']:
+                    layer_config.pop(key, None)
+                layer_config['return_state'] = True
+                step_layer = LSTM.from_config(layer_config)
+
+                h_in = Input(shape=(layer.units,))
+                c_in = Input(shape=(layer.units,))
+                h, h_out, c_out = step_layer(h, initial_state=[h_in, c_in])
+                step_layer.set_weights(layer.get_weights())
+
+                state_inputs += [h_in, c_in]
+                state_outputs += [h_out, c_out]
+            else:
+                # The Embedding, Dense and softmax layers are stateless and
+                # can be shared with the trained model.
+                h = layer(h)
+
+        return Model([x] + state_inputs, [h] + state_outputs)
+
+    def _decoder(self, step_model=None):
+        """The decoder to sample with (see :mod:`sng.sampling`). That's a
+        Keras step model from :meth:`_build_step_model` if there is one,
+        e.g. after :meth:`fit`, and the NumPy Sampler otherwise.
+        """
+
+        if step_model is None:
+            step_model = self.step_model
+        if step_model is None:
+            return self.to_sampler()
+        return _StepModelDecoder(step_model, self.vocab_size,
+                                 bool(self.config.embedding_dim))
+
+    def _generate_words(self, decoder, n, **kwargs):
+        """Sample ``n`` words at once with a decoder from
+        :meth:`_decoder`.
+
+        Keyword arguments are passed on to
+        :func:`sng.sampling.generate_words`. The temperature and word
+        lengths and the top-k/top-p truncation default to the values in
+        ``self.config``.
+        """
+
+        kwargs.setdefault('temperature', self.config.temperature)
+        kwargs.setdefault('min_word_len', self.config.min_word_len)
+        kwargs.setdefault('max_word_len', self.config.max_word_len)
+        kwargs.setdefault('top_k', self.config.top_k)
+        kwargs.setdefault('top_p', self.config.top_p)
+
+        return generate_words(decoder, n, self.ix_to_char, **kwargs)
+
+
+class _StepModelDecoder:
+    """Adapts a Keras step model to the decoder interface of
+    :mod:`sng.sampling`.
+    """
+
+    def __init__(self, step_model, vocab_size, integer_inputs=False):
+        self.step_model = step_model
+        self.vocab_size = vocab_size
+        self.integer_inputs = integer_inputs
+
+    def initial_state(self, n):
+        from keras.backend import int_shape
+        return [np.zeros((n, int_shape(state)[-1]), dtype=np.float32)
+                for state in self.step_model.inputs[1:]]
+
+    def step(self, ix, states):
+        if self.integer_inputs:
+            # The Embedding input is shifted by one, so that the start of a
+            # word (ix == -1) becomes the padding index 0.
+            x = (ix + 1)[:, np.newaxis]
+        else:
+            # One-hot encode the previous characters. At the start of a
+            # word, the all-zero input yields the distribution of the
+            # first character.
+            x = one_hot(ix[:, np.newaxis], self.vocab_size)
+
+        outputs = self.step_model.predict([x] + states, batch_size=len(ix))
+        return outputs[0][:, -1, :], outputs[1:]
@@ -0,0 +1,265 @@
+"""The NGramModel module. It defines the NGramModel class, a character
+n-gram model that trains in seconds and only needs NumPy.
+"""
+
+import os
+import json
+import numpy as np
+
+from .Config import Config
+from .Sampler import Sampler
+
+
+class NGramModel:
+    """A character n-gram model with interpolated Witten-Bell smoothing.
+
+    The next character is predicted from the previous ``order - 1``
+    characters of the word, where the start of a word counts as a special
+    character. The probabilities of every context seen in training are
+    precomputed, mixed with those of the shorter contexts. Contexts that
+    were never seen back off to their longest seen suffix.
+
+    An NGramModel is a decoder as described in :mod:`sng.sampling`, and can
+    be used in place of a :class:`sng.Sampler`. Train one with
+    ``sng.Config(backend='ngram')`` and :meth:`sng.Generator.fit`.
+
+    Parameters
+    ----------
+    config : sng.Config
+        The Config the model was trained with. Its simulation options are
+        used as defaults in :meth:`simulate`.
+    chars : list of strings
+        The character vocabulary, i.e. ``Generator.chars``.
+    contexts : list of numpy arrays
+        For every order ``k`` from 1 to ``order``, the sorted ids of the
+        seen contexts of ``k - 1`` characters. An id is a number in base
+        ``vocab_size + 1`` with one digit per character, the last character
+        being the least significant digit and ``vocab_size`` standing for
+        the start of the word.
+    probs : list of numpy arrays
+        For every order, the ``(len(contexts[k - 1]), vocab_size)``
+        next-character probabilities of these contexts.
+
+    Examples
+    --------
+    ::
+
+        cfg = sng.Config(backend='ngram', ngram_order=4)
+        gen = sng.Generator(wordlist_file='my_wordlist.txt', config=cfg)
+        gen.fit()    # takes seconds
+        gen.simulate(n=5)
+    """
+
+    def __init__(self, config, chars, contexts, probs):
+        self.config = config
+        self.chars = list(chars)
+        self.contexts = contexts
+        self.probs = probs
+
+        self.order = len(contexts)
+        self.vocab_size = len(self.chars)
+        self.base = self.vocab_size + 1
+        self.start = self.vocab_size
+
+        self.ix_to_char = {
+            ix: char for ix, char in enumerate(self.chars)
+        }
+        self.char_to_ix = {
+            char: ix for ix, char in enumerate(self.chars)
+        }
+
+    @classmethod
+    def fit(cls, batches, chars, config=Config(), order=None):
+        """Count the n-grams of a corpus.
+
+        Parameters
+        ----------
+        batches : iterable of numpy arrays
+            The encoded words, as returned by
+            :func:`sng.helpers.encode_words`. Pass several matrices to
+            count a corpus that doesn't fit into memory at once. The words
+            should not be truncated, so that their endings are counted.
+        chars : list of strings
+            The character vocabulary, i.e. ``Generator.chars``.
+        config : sng.Config
+            The Config to store with the model.
+        order : int, optional
+            The n-gram order. Defaults to ``config.ngram_order``.
+        """
+
+        if order is None:
+            order = config.ngram_order
+        vocab_size = len(chars)
+        base = vocab_size + 1
+        if float(base) ** (order - 1) * vocab_size >= 2**63:
+            raise ValueError('ngram_order ' + str(order) + ' is too high '
+                             'for ' + str(vocab_size) + ' characters')
+
+        # The unique (context, next character) keys and their counts, per
+        # order and per batch:
+        keys = [[] for _ in range(order)]
+        counts = [[] for _ in range(order)]
+        for seqs in batches:
+            n, length = seqs.shape
+            padded = np.full((n, order - 1 + length), vocab_size,
+                             dtype=np.int64)
+            padded[:, order - 1:] = seqs
+            valid = seqs >= 0
+            context = np.zeros((n, length), dtype=np.int64)
+            for k in range(1, order + 1):
+                if k > 1:
+                    # Add the character k - 1 positions back as the next
+                    # most significant digit:
+                    start = order - k
+                    context += padded[:, start:start + length] * \
+                        base ** (k - 2)
+                batch_keys, batch_counts = np.unique(
+                    context[valid] * vocab_size + seqs[valid],
+                    return_counts=True)
+                keys[k - 1].append(batch_keys)
+                counts[k - 1].append(batch_counts)
+
+        contexts = []
+        probs = []
+        for k in range(1, order + 1):
+            unique_keys, inverse = np.unique(np.concatenate(keys[k - 1]),
+                                             return_inverse=True)
+            key_counts = np.bincount(inverse,
+                                     weights=np.concatenate(counts[k - 1]))
+            ids, rows = np.unique(unique_keys // vocab_size,
+                                  return_inverse=True)
+            table = np.zeros((len(ids), vocab_size))
+            table[rows, unique_keys % vocab_size] = key_counts
+
+            totals = np.sum(table, axis=1, keepdims=True)
+            if k == 1:
+                p = table / totals
+            else:
+                # Witten-Bell: mix in the distribution of the context
+                # without its oldest character, which was seen as well.
+                types = np.sum(table > 0, axis=1, keepdims=True)
+                shorter = np.searchsorted(contexts[-1],
+                                          ids % base ** (k - 2))
+                p = (table + types * probs[-1][shorter]) / (totals + types)
+            contexts.append(ids)
+            probs.append(p.astype(np.float32))
+
+        return cls(config, chars, contexts, probs)
+
+    def save(self, directory):
+        """Write the vocabulary and probability tables as plain ``.npy``
+        arrays, plus a small ``meta.json`` file holding the config.
+
+        :meth:`sng.Sampler.load` recognizes the folder and returns an
+        NGramModel.
+
+        Parameters
+        ----------
+        directory : str
+            The folder to store the arrays in. Will be created if necessary.
+        """
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        np.save(os.path.join(directory, 'chars.npy'), np.array(self.chars))
+        for k in range(1, self.order + 1):
+            np.save(os.path.join(directory, 'contexts_' + str(k) + '.npy'),
+                    self.contexts[k - 1])
+            np.save(os.path.join(directory, 'probs_' + str(k) + '.npy'),
+                    self.probs[k - 1])
+
+        meta = {
+            'backend': 'ngram',
+            'order': self.order,
+            'config': self.config.to_dict(),
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        """Create an NGramModel from a stored folder.
+
+        Arguments
+        ---------
+        directory : str
+            Folder where you used :meth:`sng.Generator.save` or
+            :meth:`save` to store the contents in.
+        mmap_mode : str or None
+            If ``'r'``, the arrays are memory-mapped instead of read, so
+            processes that load the same folder share one copy of them.
+        """
+
+        if os.path.isdir(os.path.join(directory, 'inference')):
+            directory = os.path.join(directory, 'inference')
+
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+
+        chars = np.load(os.path.join(directory, 'chars.npy')).tolist()
+        contexts = []
+        probs = []
+        for k in range(1, meta['order'] + 1):
+            contexts.append(np.load(
+                os.path.join(directory, 'contexts_' + str(k) + '.npy'),
+                mmap_mode=mmap_mode))
+            probs.append(np.load(
+                os.path.join(directory, 'probs_' + str(k) + '.npy'),
+                mmap_mode=mmap_mode))
+
+        return cls(Config(**meta['config']), chars, contexts, probs)
+
+    def _advance(self, ids, ix):
+        # Append a character as the least significant digit, and drop the
+        # most significant one, i.e. the oldest character:
+        return (ids * self.base + ix) % self.base ** (self.order - 1)
+
+    def initial_state(self, n):
+        """The context ids at the start of ``n`` words, i.e. ``order - 1``
+        start-of-word characters.
+        """
+
+        start = sum(self.start * self.base ** j
+                    for j in range(self.order - 1))
+        return [np.full(n, start, dtype=np.int64)]
+
+    def step(self, ix, states):
+        """Advance all words by one character.
+
+        Parameters
+        ----------
+        ix : numpy array
+            The ``(n,)`` previous characters' indices, or -1 at the start
+            of a word.
+        states : list of numpy arrays
+            A list holding the ``(n,)`` context ids.
+
+        Returns
+        -------
+        tuple : The ``(n, vocab_size)`` next-character probabilities, and
+            the updated list of states.
+        """
+
+        ids = states[0]
+        ids = np.where(ix >= 0, self._advance(ids, np.maximum(ix, 0)), ids)
+
+        probs = np.empty((len(ids), self.vocab_size), dtype=np.float32)
+        todo = np.arange(len(ids))
+        for k in range(self.order, 0, -1):
+            # The context of the last k - 1 characters:
+            suffix = ids[todo] % self.base ** (k - 1)
+            pos = np.searchsorted(self.contexts[k - 1], suffix)
+            pos = np.minimum(pos, len(self.contexts[k - 1]) - 1)
+            seen = self.contexts[k - 1][pos] == suffix
+            probs[todo[seen]] = self.probs[k - 1][pos[seen]]
+            todo = todo[~seen]
+            if len(todo) == 0:
+                break
+        return probs, [ids]
+
+    # Simulating and scoring only need the decoder interface and the
+    # config:
+    simulate = Sampler.simulate
+    best_names = Sampler.best_names
+    log_likelihood = Sampler.log_likelihood
@@ -0,0 +1,183 @@
+"""The NamePool module. It defines the NamePool class, a cache of
+pre-sampled names for interactive use.
+"""
+
+import collections
+import threading
+import time
+
+from .sampling import generate_words
+
+
+class NamePool:
+    """Keep buffers of pre-sampled names, so requests return instantly.
+
+    There is one buffer per combination of temperature and word length
+    bounds. When a buffer drops below the low watermark, a background
+    thread refills it. The least recently used buffers are evicted when
+    there are more than ``max_keys`` of them.
+
+    Parameters
+    ----------
+    model : sng.Sampler, sng.NGramModel or sng.Generator
+        The model to sample names from. A Generator's Keras model is
+        converted to a :class:`sng.Sampler` first, since Keras models can't
+        safely be used from a background thread.
+    capacity : int
+        The maximum number of names per buffer.
+    low_watermark : float
+        Refill a buffer when it holds less than this fraction of
+        ``capacity``.
+    max_keys : int
+        The maximum number of buffers.
+
+    Attributes
+    ----------
+    stats : dict
+        Counters for ``hits`` and ``misses`` (requests that were, or were
+        not, fully served from a buffer), ``evictions``, ``refills``, and
+        the total and last refill latency in seconds.
+
+    Examples
+    --------
+    ::
+
+        pool = sng.NamePool(sng.Sampler.load('my_model'))
+        pool.get(5, temperature=0.8, suffix=' Labs')
+        pool.close()
+    """
+
+    def __init__(self, model, capacity=1000, low_watermark=0.25,
+                 max_keys=32):
+        if hasattr(model, 'to_sampler'):
+            model = model.to_sampler()
+        self.sampler = model
+        self.capacity = capacity
+        self.low_watermark = low_watermark
+        self.max_keys = max_keys
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'refills': 0,
+            'refill_seconds': 0.0,
+            'last_refill_seconds': 0.0,
+        }
+
+        self._buffers = collections.OrderedDict()
+        self._pending = []
+        self._refilling = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._refill_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _sample(self, key, n):
+        temperature, min_word_len, max_word_len = key
+        return generate_words(self.sampler, n, self.sampler.ix_to_char,
+                              temperature=temperature,
+                              min_word_len=min_word_len,
+                              max_word_len=max_word_len,
+                              top_k=self.sampler.config.top_k,
+                              top_p=self.sampler.config.top_p)
+
+    def get(self, n=10, temperature=None, min_word_len=None,
+            max_word_len=None, suffix=None):
+        """Get ``n`` names, from the buffer if possible.
+
+        Missing names are sampled right away. The arguments default to the
+        values in the model's config. The suffix is appended on the way
+        out, so names with different suffixes share one buffer.
+
+        Returns
+        -------
+        list : The names.
+        """
+
+        config = self.sampler.config
+        key = (
+            config.temperature if temperature is None else temperature,
+            config.min_word_len if min_word_len is None else min_word_len,
+            config.max_word_len if max_word_len is None else max_word_len,
+        )
+        suffix = config.suffix if suffix is None else suffix
+
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is None:
+                buffer = collections.deque()
+                self._buffers[key] = buffer
+                while len(self._buffers) > self.max_keys:
+                    evicted, _ = self._buffers.popitem(last=False)
+                    if evicted in self._pending:
+                        self._pending.remove(evicted)
+                    self.stats['evictions'] += 1
+            self._buffers.move_to_end(key)
+
+            names = [buffer.popleft() for _ in range(min(n, len(buffer)))]
+            self.stats['hits' if len(names) == n else 'misses'] += 1
+
+            if (len(buffer) < self.low_watermark * self.capacity and
+                    key not in self._pending):
+                self._pending.append(key)
+                self._wakeup.notify()
+
+        if len(names) < n:
+            names += self._sample(key, n - len(names))
+        return [name + suffix for name in names]
+
+    def _refill_loop(self):
+        while True:
+            with self._lock:
+                self._refilling = False
+                while not self._pending and not self._closed:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+                key = self._pending.pop(0)
+                buffer = self._buffers.get(key)
+                if buffer is None or len(buffer) >= self.capacity:
+                    continue
+                missing = self.capacity - len(buffer)
+                self._refilling = True
+
+            start = time.time()
+            names = self._sample(key, missing)
+            seconds = time.time() - start
+
+            with self._lock:
+                buffer = self._buffers.get(key)
+                if buffer is not None:
+                    buffer.extend(names[:self.capacity - len(buffer)])
+                self.stats['refills'] += 1
+                self.stats['refill_seconds'] += seconds
+                self.stats['last_refill_seconds'] = seconds
+
+    def wait_idle(self, timeout=None):
+        """Wait until all pending refills are done, e.g. to warm up the
+        pool before serving.
+
+        Returns
+        -------
+        bool : False if the timeout expired first.
+        """
+
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if not self._pending and not self._refilling:
+                    return True
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.001)
+
+    def close(self):
+        """Stop the background refill thread."""
+
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join()
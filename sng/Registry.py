@@ -0,0 +1,118 @@
+"""The Registry module. It defines the Registry class, which serves many
+saved generators from one process.
+"""
+
+import collections
+import os
+import threading
+
+from .Generator import Generator
+
+
+class Registry:
+    """Load saved generators by name, on first use.
+
+    At most ``max_loaded`` generators are kept in memory; the least
+    recently used one is dropped when another one is loaded. Loading is
+    cheap, since it reads neither the Keras model nor the wordlist (see
+    :meth:`sng.Generator.load`). The NumPy weights and the corpus are
+    memory-mapped, so all processes that serve the same folders share one
+    copy of them in the page cache, no matter how many workers there are.
+
+    Parameters
+    ----------
+    root : str, optional
+        A folder holding one folder per generator, as written by
+        :meth:`sng.Generator.save`. Their names are the folder names.
+    max_loaded : int
+        The maximum number of generators to keep loaded.
+    mmap_mode : str or None
+        Passed on to :meth:`sng.Generator.load`. None reads the weights
+        into each process' own memory instead.
+
+    Attributes
+    ----------
+    stats : dict
+        Counters for ``loads`` and ``evictions``.
+
+    Examples
+    --------
+    ::
+
+        registry = sng.Registry('models/')
+        registry.names()                   # ['english', 'pokemon', ...]
+        registry.simulate('pokemon', n=5)
+    """
+
+    def __init__(self, root=None, max_loaded=8, mmap_mode='r'):
+        self.max_loaded = max_loaded
+        self.mmap_mode = mmap_mode
+        self.directories = {}
+        self.stats = {'loads': 0, 'evictions': 0}
+
+        self._loaded = collections.OrderedDict()
+        self._lock = threading.Lock()
+        if root is not None:
+            self.add_folder(root)
+
+    def add(self, name, directory):
+        """Register a folder written by :meth:`sng.Generator.save`.
+        """
+
+        with self._lock:
+            self.directories[name] = directory
+            # A generator of the same name may have been loaded before:
+            self._loaded.pop(name, None)
+
+    def add_folder(self, root):
+        """Register every saved generator in a folder, by folder name.
+        """
+
+        for name in sorted(os.listdir(root)):
+            directory = os.path.join(root, name)
+            if os.path.exists(os.path.join(directory, 'manifest.json')) or \
+                    os.path.exists(os.path.join(directory, 'config.pkl')):
+                self.add(name, directory)
+
+    def names(self):
+        """The names of all registered generators.
+        """
+
+        return sorted(self.directories)
+
+    def __contains__(self, name):
+        return name in self.directories
+
+    def __len__(self):
+        return len(self.directories)
+
+    def get(self, name):
+        """Get a generator, loading it if necessary.
+
+        Raises
+        ------
+        KeyError : If no generator of that name is registered.
+        """
+
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+            directory = self.directories[name]
+
+            generator = Generator.load(directory, mmap_mode=self.mmap_mode)
+            self._loaded[name] = generator
+            self.stats['loads'] += 1
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+                self.stats['evictions'] += 1
+            return generator
+
+    __getitem__ = get
+
+    def simulate(self, name, n=10, **kwargs):
+        """Simulate names with one of the generators. Keyword arguments
+        are passed on to :meth:`sng.Generator.simulate`.
+        """
+
+        return self.get(name).simulate(n, **kwargs)
@@ -0,0 +1,397 @@
+"""The Sampler module. It defines the Sampler class, a lightweight
+inference backend that only needs NumPy.
+"""
+
+import os
+import json
+import numpy as np
+
+from .Config import Config
+from .sampling import generate_words, collect_words, best_words
+from .sampling import log_likelihood
+
+
+def _hard_sigmoid(x):
+    return np.clip(0.2 * x + 0.5, 0, 1)
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+# The activations that Keras' LSTM layers can be configured with:
+ACTIVATIONS = {
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid,
+    'relu': lambda x: np.maximum(x, 0),
+    'linear': lambda x: x,
+}
+
+
+class Sampler:
+    """Simulate names from a trained model without Keras or TensorFlow.
+
+    The Sampler reimplements the forward pass of the network built by
+    :meth:`sng.Generator.fit` in plain NumPy. It is meant for serving
+    workers that only need to sample names from a saved model, and
+    should therefore not pay for importing a deep learning framework.
+
+    Parameters
+    ----------
+    config : sng.Config
+        The Config the model was trained with. Its simulation options are
+        used as defaults in :meth:`simulate`.
+    chars : list of strings
+        The character vocabulary, i.e. ``Generator.chars``.
+    weights : dict
+        The network weights as NumPy arrays. ``lstm_<i>_kernel``,
+        ``lstm_<i>_recurrent_kernel`` and ``lstm_<i>_bias`` for every
+        LSTM layer ``i``, plus ``dense_kernel`` and ``dense_bias``.
+        Optionally ``lstm_0_start``, the first layer's input at the start
+        of a word. It defaults to zero, i.e. an all-zero one-hot vector.
+    activation : str
+        The LSTM layers' activation function.
+    recurrent_activation : str
+        The LSTM layers' recurrent activation function.
+
+    Examples
+    --------
+    Use :meth:`sng.Generator.save` to store a trained model, then load it
+    in another process::
+
+        sampler = sng.Sampler.load('my_model')
+        sampler.simulate(n=5)
+    """
+
+    def __init__(self, config, chars, weights, activation='tanh',
+                 recurrent_activation='hard_sigmoid'):
+        self.config = config
+        self.chars = list(chars)
+        self.weights = weights
+        self.activation = activation
+        self.recurrent_activation = recurrent_activation
+
+        self.vocab_size = len(self.chars)
+        self.n_layers = len([key for key in weights
+                             if key.endswith('_recurrent_kernel')])
+
+        self.ix_to_char = {
+            ix: char for ix, char in enumerate(self.chars)
+        }
+        self.char_to_ix = {
+            char: ix for ix, char in enumerate(self.chars)
+        }
+
+    @classmethod
+    def from_model(cls, model, chars, config=Config()):
+        """Extract the weights from a Keras model as built by
+        :meth:`sng.Generator.fit`.
+
+        Parameters
+        ----------
+        model : keras.models.Sequential
+            The trained model.
+        chars : list of strings
+            The character vocabulary, i.e. ``Generator.chars``.
+        config : sng.Config
+            The Config the model was trained with.
+        """
+
+        weights = {}
+        embeddings = None
+        activation = 'tanh'
+        recurrent_activation = 'hard_sigmoid'
+        n_lstm = 0
+        for layer in model.layers:
+            # Compare class names to get by without importing Keras here
+            layer_type = type(layer).__name__
+            if layer_type == 'Embedding':
+                embeddings = layer.get_weights()[0]
+            elif layer_type == 'LSTM':
+                kernel, recurrent_kernel, bias = layer.get_weights()
+                prefix = 'lstm_' + str(n_lstm) + '_'
+                if n_lstm == 0 and embeddings is not None:
+                    # Fold the embedding into the first LSTM's kernel. Row
+                    # 0 of the embedding is the start-of-word input.
+                    kernel = np.dot(embeddings, kernel)
+                    weights[prefix + 'start'] = kernel[0]
+                    kernel = kernel[1:]
+                weights[prefix + 'kernel'] = kernel
+                weights[prefix + 'recurrent_kernel'] = recurrent_kernel
+                weights[prefix + 'bias'] = bias
+                layer_config = layer.get_config()
+                activation = layer_config['activation']
+                recurrent_activation = layer_config['recurrent_activation']
+                n_lstm += 1
+            elif layer_type == 'TimeDistributed':
+                kernel, bias = layer.layer.get_weights()
+                weights['dense_kernel'] = kernel
+                weights['dense_bias'] = bias
+
+        return cls(config, chars, weights, activation=activation,
+                   recurrent_activation=recurrent_activation)
+
+    def save(self, directory):
+        """Write the vocabulary and weights as plain ``.npy`` arrays, plus a
+        small ``meta.json`` file holding the config and activations.
+
+        Parameters
+        ----------
+        directory : str
+            The folder to store the arrays in. Will be created if necessary.
+        """
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        np.save(os.path.join(directory, 'chars.npy'), np.array(self.chars))
+        for key, array in self.weights.items():
+            np.save(os.path.join(directory, key + '.npy'), array)
+
+        meta = {
+            'activation': self.activation,
+            'recurrent_activation': self.recurrent_activation,
+            'config': self.config.to_dict(),
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        """Create a Sampler from a stored folder.
+
+        Arguments
+        ---------
+        directory : str
+            Folder where you used :meth:`sng.Generator.save` to store the
+            contents in. The arrays are read from its ``inference/``
+            subfolder. If it holds an n-gram model, an
+            :class:`sng.NGramModel` is returned instead.
+        mmap_mode : str or None
+            If ``'r'``, the arrays are memory-mapped instead of read, so
+            processes that load the same folder share one copy of them.
+        """
+
+        if os.path.isdir(os.path.join(directory, 'inference')):
+            directory = os.path.join(directory, 'inference')
+
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('backend') == 'ngram':
+            from .NGramModel import NGramModel
+            return NGramModel.load(directory, mmap_mode)
+
+        chars = np.load(os.path.join(directory, 'chars.npy')).tolist()
+        weights = {}
+        for filename in os.listdir(directory):
+            key, ext = os.path.splitext(filename)
+            if ext == '.npy' and key != 'chars':
+                weights[key] = np.load(os.path.join(directory, filename),
+                                       mmap_mode=mmap_mode)
+
+        return cls(Config(**meta['config']), chars, weights,
+                   activation=meta['activation'],
+                   recurrent_activation=meta['recurrent_activation'])
+
+    def initial_state(self, n):
+        """The all-zero hidden and cell states of every LSTM layer for
+        ``n`` words.
+        """
+
+        states = []
+        for i in range(self.n_layers):
+            units = self.weights['lstm_' + str(i) + '_recurrent_kernel'
+                                 ].shape[0]
+            states.append(np.zeros((n, units), dtype=np.float32))
+            states.append(np.zeros((n, units), dtype=np.float32))
+        return states
+
+    def step(self, ix, states):
+        """Advance all words by one character.
+
+        Parameters
+        ----------
+        ix : numpy array
+            The ``(n,)`` previous characters' indices, or -1 at the start
+            of a word.
+        states : list of numpy arrays
+            The hidden and cell states of every LSTM layer.
+
+        Returns
+        -------
+        tuple : The ``(n, vocab_size)`` next-character probabilities, and
+            the updated list of states.
+        """
+
+        act = ACTIVATIONS[self.activation]
+        rec_act = ACTIVATIONS[self.recurrent_activation]
+
+        new_states = []
+        h = None
+        for i in range(self.n_layers):
+            prefix = 'lstm_' + str(i) + '_'
+            kernel = self.weights[prefix + 'kernel']
+            h_prev, c_prev = states[2 * i], states[2 * i + 1]
+
+            if i == 0:
+                # The input is one-hot encoded, so the matrix product is
+                # just a row lookup.
+                z = kernel[np.maximum(ix, 0)]
+                z[ix < 0] = self.weights.get('lstm_0_start', 0)
+            else:
+                z = np.dot(h, kernel)
+            z = z + np.dot(h_prev,
+                           self.weights[prefix + 'recurrent_kernel'])
+            z = z + self.weights[prefix + 'bias']
+
+            # Keras orders the gates as input, forget, cell, output:
+            z_i, z_f, z_c, z_o = np.split(z, 4, axis=1)
+            c = rec_act(z_f) * c_prev + rec_act(z_i) * act(z_c)
+            h = rec_act(z_o) * act(c)
+            new_states += [h, c]
+
+        logits = np.dot(h, self.weights['dense_kernel'])
+        logits = logits + self.weights['dense_bias']
+        logits = logits - np.max(logits, axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs = probs / np.sum(probs, axis=1, keepdims=True)
+        return probs, new_states
+
+    def simulate(self, n=10, temperature=None, min_word_len=None,
+                 max_word_len=None, unique=False, startswith='',
+                 endswith='', banned_chars='', top_k=None, top_p=None,
+                 random_state=None):
+        """Simulate a few name suggestions.
+
+        Parameters
+        ----------
+
+        n : int
+            The number of name suggestions to simulate
+        temperature : float or None
+            Sampling temperature. Lower values are "colder", i.e.
+            sampling probabilities will be more conservative.
+            If None, will use the value specified in self.config.
+        min_word_len : int or None
+            Minimum word length of the simulated names.
+            If None, will use the value specified in self.config.
+        max_word_len : int or None
+            Maximum word length of the simulated names.
+            If None, will use the value specified in self.config.
+        unique : bool
+            If True, return ``n`` distinct names, or fewer if the model
+            can't produce that many. See :func:`sng.sampling.collect_words`.
+        startswith : str
+            Every name starts with these characters.
+        endswith : str
+            Every name ends with these characters (before
+            ``config.suffix``). They count towards the word length.
+        banned_chars : str
+            Characters that must not appear in the names.
+        top_k : int or None
+            Only sample from the ``top_k`` most likely characters at every
+            position. If None, will use the value specified in self.config.
+        top_p : float or None
+            Only sample from the most likely characters whose total
+            probability is at least ``top_p``. If None, will use the value
+            specified in self.config.
+        random_state : numpy.random.RandomState, optional
+            The random number generator to draw from.
+        """
+
+        if temperature is None:
+            temperature = self.config.temperature
+        if min_word_len is None:
+            min_word_len = self.config.min_word_len
+        if max_word_len is None:
+            max_word_len = self.config.max_word_len
+        if top_k is None:
+            top_k = self.config.top_k
+        if top_p is None:
+            top_p = self.config.top_p
+
+        def sample(size):
+            return generate_words(self, size, self.ix_to_char,
+                                  temperature=temperature,
+                                  min_word_len=min_word_len,
+                                  max_word_len=max_word_len,
+                                  startswith=startswith, endswith=endswith,
+                                  banned_chars=banned_chars,
+                                  top_k=top_k, top_p=top_p,
+                                  random_state=random_state)
+
+        if unique:
+            words, _ = collect_words(sample, n, unique=True)
+        else:
+            words = sample(n)
+        return [word + self.config.suffix for word in words]
+
+    def best_names(self, n=10, min_word_len=None, max_word_len=None,
+                   startswith='', banned_chars='', beam_width=None):
+        """Find the most likely names with a beam search, see
+        :func:`sng.sampling.best_words`.
+
+        Parameters
+        ----------
+        n : int
+            The number of names to find.
+        min_word_len : int or None
+            Minimum word length of the names.
+            If None, will use the value specified in self.config.
+        max_word_len : int or None
+            Maximum word length of the names.
+            If None, will use the value specified in self.config.
+        startswith : str
+            Every name starts with these characters.
+        banned_chars : str
+            Characters that must not appear in the names.
+        beam_width : int or None
+            The number of partial names to keep at every position.
+            Defaults to ``n``.
+
+        Returns
+        -------
+        list : Up to ``n`` tuples of a name and its log probability, the
+            most likely name first.
+        """
+
+        if min_word_len is None:
+            min_word_len = self.config.min_word_len
+        if max_word_len is None:
+            max_word_len = self.config.max_word_len
+
+        words = best_words(self, n, self.ix_to_char,
+                           min_word_len=min_word_len,
+                           max_word_len=max_word_len, startswith=startswith,
+                           banned_chars=banned_chars, beam_width=beam_width)
+        return [(word + self.config.suffix, score) for word, score in words]
+
+    def log_likelihood(self, names):
+        """Compute the log probability of every name under the model, see
+        :func:`sng.sampling.log_likelihood`.
+
+        Parameters
+        ----------
+        names : list of strings
+            The names to score, e.g. from :meth:`simulate`. A trailing
+            ``config.suffix`` is ignored.
+
+        Returns
+        -------
+        numpy array : The log probabilities, ``-inf`` for names with
+            characters that are not in the vocabulary.
+        """
+
+        return log_likelihood(self, _strip_suffix(names, self.config.suffix),
+                              self.char_to_ix)
+
+
+def _strip_suffix(names, suffix):
+    """Remove ``suffix`` from the end of the names that have it.
+    """
+
+    if not suffix:
+        return list(names)
+    return [name[:-len(suffix)] if name.endswith(suffix) else name
+            for name in names]
@@ -11,10 +11,17 @@
 # You must explicitly import submodules:
 from .Generator import Generator
 from .Config import Config
-from . import helpers
+from .Sampler import Sampler
+from .NGramModel import NGramModel
+from .BloomFilter import BloomFilter
+from .Corpus import Corpus
+from .NamePool import NamePool
+from .Registry import Registry
+from . import helpers, cache
 
 from .builtin_wordlists import show_builtin_wordlists, load_builtin_wordlist
 
 __version__ = '0.3.2'
-__all__ = ['Generator', 'Config', 'helpers',
+__all__ = ['Generator', 'Config', 'Sampler', 'NGramModel', 'BloomFilter',
+           'Corpus', 'NamePool', 'Registry', 'helpers', 'cache',
            'show_builtin_wordlists', 'load_builtin_wordlist']
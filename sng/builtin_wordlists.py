@@ -1,5 +1,6 @@
 import os
-from keras.preprocessing.text import text_to_word_sequence
+
+from .helpers import read_wordlist_file
 
 
 def show_builtin_wordlists():
@@ -34,11 +35,6 @@ def load_builtin_wordlist(name):
     path = os.path.join(os.path.dirname(__file__), "wordlists")
     wordlist_file = os.path.join(path, name)
     if os.path.isfile(wordlist_file):
-        contents = open(wordlist_file).read().replace('\n', ' ')
-        wordlist = text_to_word_sequence(
-            contents,
-            filters='!"#$%&()*+,-./:;<=>?@[\]^_`{|}~0123456789–…\'\"’«·»'
-        )
-        return wordlist
+        return read_wordlist_file(wordlist_file)
     else:
         raise FileNotFoundError('Could not find the file ' + wordlist_file)
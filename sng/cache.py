@@ -0,0 +1,143 @@
+"""The cache module. It caches processed corpora, so that repeated
+experiments on the same wordlist file skip reading and tokenizing it.
+
+Entries are stored in ``$SNG_CACHE_DIR``, or ``$XDG_CACHE_HOME/sng``, or
+``~/.cache/sng``, and keyed by a hash of the file contents. A changed file
+therefore gets a new entry, and stale ones can simply be deleted.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from .Corpus import Corpus
+from .helpers import read_wordlist_file, process_wordlist, encode_words
+
+# Bump this whenever the tokenization or the entry layout changes:
+CACHE_VERSION = 2
+
+
+def cache_dir():
+    """The folder cache entries are stored in.
+    """
+
+    if os.environ.get('SNG_CACHE_DIR'):
+        return os.environ['SNG_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'sng')
+
+
+def file_key(path, options=None, chunk_size=2**20):
+    """Hash a file's contents, the processing options and the cache
+    version.
+    """
+
+    digest = hashlib.sha256(b'sng-corpus-%d\n' % CACHE_VERSION)
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_corpus(wordlist_file, line_mode=False, max_vocab_size=None,
+                rare_buckets=1):
+    """Get the processed version of a wordlist file.
+
+    On a cache miss, the file is read and tokenized with
+    :func:`sng.helpers.read_wordlist_file`, and processed with
+    :func:`sng.helpers.process_wordlist`. Its unique words are stored as a
+    :class:`sng.Corpus`, along with its vocabulary.
+
+    Parameters
+    ----------
+    wordlist_file : str
+        Path to a textfile holding the text corpus.
+    line_mode, max_vocab_size, rare_buckets
+        The processing options, see :class:`sng.Config`.
+
+    Returns
+    -------
+    tuple : The unique words as a memory-mapped :class:`sng.Corpus`, the
+        sorted list of characters, including the newline, and the list of
+        the rare-character buckets' representatives.
+
+    Raises
+    ------
+    OSError : If the cache folder can't be written to, e.g. because it is
+        read-only.
+    """
+
+    options = {'line_mode': line_mode, 'max_vocab_size': max_vocab_size,
+               'rare_buckets': rare_buckets}
+    entry = os.path.join(cache_dir(), 'corpora',
+                         file_key(wordlist_file, options))
+    vocab_file = os.path.join(entry, 'vocab.json')
+    if not os.path.exists(vocab_file):
+        words, chars, bucket_chars = process_wordlist(
+            read_wordlist_file(wordlist_file, line_mode), max_vocab_size,
+            rare_buckets)
+
+        # Write into a temporary folder first and then move it into place,
+        # so that no process ever sees a half-written entry:
+        parent = os.path.dirname(entry)
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=parent)
+        try:
+            Corpus.write(words, tmp)
+            with open(os.path.join(tmp, 'vocab.json'), 'w') as f:
+                json.dump({'chars': chars, 'bucket_chars': bucket_chars}, f)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another process was faster
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    with open(vocab_file) as f:
+        vocab = json.load(f)
+    return Corpus(entry), vocab['chars'], vocab['bucket_chars']
+
+
+def encoded_corpus(corpus, chars, max_word_len):
+    """Encode all words of a corpus with :func:`sng.helpers.encode_words`,
+    and cache the result for the next call.
+
+    The entry is keyed by the corpus' word hashes, which also fix its
+    order, and the vocabulary. It is stored in the cache folder, never in
+    the corpus' own folder, which may belong to a saved model.
+
+    Returns
+    -------
+    numpy array : The integer sequences, in corpus order.
+    """
+
+    digest = hashlib.sha256(b'sng-seqs-%d\n' % CACHE_VERSION)
+    digest.update(json.dumps([chars, max_word_len]).encode('utf-8'))
+    digest.update(np.ascontiguousarray(corpus.hashes).tobytes())
+    seqs_file = os.path.join(cache_dir(), 'encoded',
+                             digest.hexdigest() + '.npy')
+    if os.path.exists(seqs_file):
+        return np.load(seqs_file, mmap_mode='r')
+
+    char_to_ix = {char: ix for ix, char in enumerate(chars)}
+    seqs = encode_words([word + '\n' for word in corpus], char_to_ix,
+                        max_word_len)
+    try:
+        # Through a temporary file, for the same reason as above
+        os.makedirs(os.path.dirname(seqs_file), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(seqs_file),
+                                   suffix='.npy')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, seqs)
+        os.replace(tmp, seqs_file)
+    except OSError:
+        # E.g. a read-only folder. The cache is optional.
+        pass
+    return seqs
@@ -0,0 +1,131 @@
+"""The cli module. Writes name suggestions from a saved model to a file.
+
+Run it on a folder written by :meth:`sng.Generator.save`::
+
+    sng my_model -n 5
+    sng my_model -n 5000000 --unique --new --output names.txt --progress
+
+The names are sampled in batches with :meth:`sng.Generator.iter_simulate`
+and written as they come, one per line, so the output can be much larger
+than the memory. Progress is reported on stderr, so the names can be piped
+on, e.g. into ``sort`` or ``head``.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from .Generator import Generator
+
+
+def write_names(batches, f, n=None, progress=False):
+    """Write batches of names to a file, one name per line.
+
+    Parameters
+    ----------
+    batches : iterable of lists
+        The batches of names, e.g. from :meth:`sng.Generator.iter_simulate`.
+    f : file
+        The text file to write to. Every batch is written at once.
+    n : int, optional
+        The expected total number of names, for the progress report.
+    progress : bool
+        If True, report the number of names written so far and the speed
+        on ``stderr`` after every batch.
+
+    Returns
+    -------
+    int : The number of names written.
+    """
+
+    start = time.perf_counter()
+    n_written = 0
+    for names in batches:
+        f.write('\n'.join(names) + '\n')
+        n_written += len(names)
+        if progress:
+            seconds = time.perf_counter() - start
+            total = '' if n is None else '/{:,}'.format(n)
+            print('\r{:,}{} names, {:,.0f} names/s'.format(
+                n_written, total, n_written / max(seconds, 1e-9)),
+                end='', file=sys.stderr, flush=True)
+    if progress:
+        print(file=sys.stderr)
+    return n_written
+
+
+def main(args=None):
+    """Entry point of the ``sng`` command."""
+
+    parser = argparse.ArgumentParser(
+        description='Write name suggestions from a saved sng model.')
+    parser.add_argument('directory',
+                        help='A folder written by sng.Generator.save()')
+    parser.add_argument('-n', type=int, default=10,
+                        help='The number of names')
+    parser.add_argument('-o', '--output',
+                        help='The file to write to. Default: stdout')
+    parser.add_argument('--batch-size', type=int, default=10000,
+                        help='The number of names to sample and write '
+                        'at once')
+    parser.add_argument('--unique', action='store_true',
+                        help='Write every name only once')
+    parser.add_argument('--new', action='store_true',
+                        help='Only write names that are not in the '
+                        'training corpus')
+    parser.add_argument('--temperature', type=float)
+    parser.add_argument('--min-word-len', type=int)
+    parser.add_argument('--max-word-len', type=int)
+    parser.add_argument('--startswith', default='')
+    parser.add_argument('--endswith', default='')
+    parser.add_argument('--banned-chars', default='')
+    parser.add_argument('--top-k', type=int)
+    parser.add_argument('--top-p', type=float)
+    parser.add_argument('--suffix',
+                        help='Append this to every name, instead of the '
+                        'suffix in the config')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='The number of processes to sample with')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--progress', action='store_true',
+                        help='Report the progress on stderr')
+    args = parser.parse_args(args)
+
+    gen = Generator.load(args.directory)
+    # Keep stdout for the names:
+    gen.config.verbose = False
+    if args.suffix is not None:
+        gen.config.suffix = args.suffix
+
+    batches = gen.iter_simulate(
+        args.n, batch_size=args.batch_size, temperature=args.temperature,
+        min_word_len=args.min_word_len, max_word_len=args.max_word_len,
+        new=args.new, unique=args.unique, startswith=args.startswith,
+        endswith=args.endswith, banned_chars=args.banned_chars,
+        top_k=args.top_k, top_p=args.top_p, workers=args.workers,
+        seed=args.seed)
+
+    f = sys.stdout if args.output is None else \
+        open(args.output, 'w', buffering=2**20)
+    try:
+        n_written = write_names(batches, f, args.n, args.progress)
+    except BrokenPipeError:
+        # The reader, e.g. head, has seen enough. Point stdout elsewhere, so
+        # that flushing it at exit doesn't fail again:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return
+    finally:
+        batches.close()
+        if f is not sys.stdout:
+            f.close()
+
+    if n_written < args.n:
+        print('Only found ' + str(n_written) + ' acceptable names. This '
+              'seems to be all the model can produce. Try a higher '
+              'temperature or different word lengths.', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,91 @@
 """The helpers module. Contains a few useful functions.
 """
 
+import collections
+import zlib
+
 import numpy as np
 
 
+WORD_FILTERS = '!"#$%&()*+,-./:;<=>?@[\\]^_`{|}~0123456789–…\'"’«·»'
+"""str: Characters that are stripped out of a text corpus before it is
+split into words.
+"""
+
+
+def text_to_word_sequence(text, filters=WORD_FILTERS, lower=True, split=' '):
+    """Split a text into a list of words.
+
+    This is a drop-in replacement for Keras'
+    ``keras.preprocessing.text.text_to_word_sequence`` with identical
+    behavior, so that preprocessing a corpus doesn't require importing
+    Keras and TensorFlow.
+
+    Parameters
+    ----------
+    text : str
+        The input text.
+    filters : str
+        Characters to filter out. Each of them is replaced by ``split``.
+    lower : bool
+        Whether to convert the text to lowercase.
+    split : str
+        The word separator.
+
+    Returns
+    -------
+    list : A list of words. Empty strings are dropped.
+    """
+
+    if lower:
+        text = text.lower()
+    translate_map = str.maketrans({char: split for char in filters})
+    text = text.translate(translate_map)
+    return [word for word in text.split(split) if word]
+
+
+def read_wordlist_file(wordlist_file, line_mode=False):
+    """Read a text corpus and split it into a list of words.
+
+    Parameters
+    ----------
+    wordlist_file : str
+        Path to a textfile holding the text corpus.
+    line_mode : bool
+        If True, every non-empty line is one "word", e.g. a company name
+        with spaces and symbols. Only the leading and trailing whitespace
+        is removed, and the case is kept.
+
+    Returns
+    -------
+    list : A list of strings. Duplicates are not yet removed.
+    """
+
+    if line_mode:
+        with open(wordlist_file) as f:
+            return [line.strip() for line in f if line.strip()]
+
+    # text_to_word_sequence only splits by space, not newline.
+    # Make all word separators spaces:
+    with open(wordlist_file) as f:
+        contents = f.read().replace('\n', ' ')
+    return text_to_word_sequence(contents, filters=WORD_FILTERS)
+
+
+def log_softmax(logits):
+    """Normalize each row of a ``(batch, vocab)`` matrix of logits, in log
+    space, using log-sum-exp. Entries of ``-inf`` get probability zero.
+    Rows that are ``-inf`` everywhere stay so.
+    """
+
+    top = np.max(logits, axis=-1, keepdims=True)
+    top[~np.isfinite(top)] = 0
+    shifted = logits - top
+    with np.errstate(divide='ignore'):
+        return shifted - np.log(np.sum(np.exp(shifted), axis=-1,
+                                       keepdims=True))
+
+
 def temp_scale(probs, temperature=1.0):
     """Scale probabilities according to some temperature.
 
@@ -11,8 +93,379 @@ def temp_scale(probs, temperature=1.0):
     low temperature (< 1 and approaching 0) results in the char sampling
     approaching the argmax. A high temperature (> 1, approaching infinity)
     results in sampling from a uniform distribution)
+
+    ``probs`` can be a single probability vector or a ``(batch, vocab)``
+    matrix, in which case every row is scaled separately, and
+    ``temperature`` can then be a ``(batch, 1)`` array. The computation
+    runs in log space, so zero probabilities and low temperatures neither
+    underflow nor produce NaN.
+    """
+
+    with np.errstate(divide='ignore'):
+        logits = np.log(probs) / temperature
+    return np.exp(log_softmax(logits))
+
+
+def truncate_logits(logits, top_k=None, top_p=None):
+    """Restrict sampling to the most likely characters, by setting the
+    logits of all others to ``-inf``.
+
+    Parameters
+    ----------
+    logits : numpy array
+        A ``(batch, vocab)`` matrix of unnormalized log probabilities.
+    top_k : int or None
+        Keep the ``top_k`` most likely characters of every row.
+    top_p : float or None
+        Keep the smallest set of most likely characters whose total
+        probability is at least ``top_p`` ("nucleus sampling").
+
+    Returns
+    -------
+    numpy array : The truncated logits. The most likely character of every
+        row is always kept.
+    """
+
+    logits = np.array(logits, dtype=float)
+    if top_k is not None and top_k < logits.shape[-1]:
+        kth = -np.partition(-logits, top_k - 1, axis=-1)[:, top_k - 1:top_k]
+        logits[logits < kth] = -np.inf
+    if top_p is not None and top_p < 1:
+        order = np.argsort(-logits, axis=-1)
+        probs = np.exp(log_softmax(np.take_along_axis(logits, order, -1)))
+        # Keep every character whose predecessors sum up to less than top_p:
+        before = np.cumsum(probs, axis=-1) - probs
+        drop = np.zeros(logits.shape, dtype=bool)
+        np.put_along_axis(drop, order, before >= top_p, axis=-1)
+        logits[drop] = -np.inf
+    return logits
+
+
+def sample_gumbel(logits, random_state=None):
+    """Draw one index from each row of a matrix of logits.
+
+    This uses the Gumbel-max trick: the argmax of the logits plus Gumbel
+    noise is distributed according to their softmax. The logits need not
+    be normalized, and ``-inf`` entries are never drawn.
+
+    Parameters
+    ----------
+    logits : numpy array
+        A ``(batch, vocab)`` matrix of unnormalized log probabilities.
+    random_state : numpy.random.RandomState, optional
+        The random number generator to draw from. If None, the global
+        ``np.random`` generator is used.
+
+    Returns
+    -------
+    numpy array : A ``(batch,)`` integer array of sampled indices.
+    """
+
+    rng = np.random if random_state is None else random_state
+    with np.errstate(divide='ignore'):
+        noise = -np.log(-np.log(rng.random_sample(logits.shape)))
+    return np.argmax(logits + noise, axis=-1)
+
+
+def iter_wordlist_file(wordlist_file, chunk_size=2**20, line_mode=False):
+    """Stream the words of a text corpus without reading it into memory.
+
+    Yields the same words as :func:`read_wordlist_file`, but only holds
+    about ``chunk_size`` characters in memory at any time.
+
+    Parameters
+    ----------
+    wordlist_file : str
+        Path to a textfile holding the text corpus.
+    chunk_size : int
+        How many characters to read at a time.
+    line_mode : bool
+        If True, yield every non-empty line, see
+        :func:`read_wordlist_file`.
     """
 
-    probs = np.exp(np.log(probs) / temperature)
-    probs = probs / np.sum(probs)
-    return probs
+    if line_mode:
+        with open(wordlist_file) as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+        return
+
+    carry = ''
+    with open(wordlist_file) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            text = carry + chunk
+            # The last word may continue in the next chunk. Hold back
+            # everything after the last separator:
+            cut = max(text.rfind(' '), text.rfind('\n')) + 1
+            carry = text[cut:]
+            for word in text_to_word_sequence(text[:cut].replace('\n', ' '),
+                                              filters=WORD_FILTERS):
+                yield word
+    for word in text_to_word_sequence(carry.replace('\n', ' '),
+                                      filters=WORD_FILTERS):
+        yield word
+
+
+def shuffle_stream(iterable, buffer_size, random_state=None):
+    """Shuffle a stream of items with a bounded buffer.
+
+    The first ``buffer_size`` items fill the buffer. Afterwards, every new
+    item replaces a randomly chosen item in the buffer, which is yielded.
+    Larger buffers give a more thorough shuffle.
+
+    Parameters
+    ----------
+    iterable : iterable
+        The items to shuffle.
+    buffer_size : int
+        The maximum number of items held in memory.
+    random_state : numpy.random.RandomState, optional
+        The random number generator to draw from. If None, the global
+        ``np.random`` generator is used.
+    """
+
+    rng = np.random if random_state is None else random_state
+    buffer = []
+    for item in iterable:
+        if len(buffer) < buffer_size:
+            buffer.append(item)
+            continue
+        i = rng.randint(buffer_size)
+        yield buffer[i]
+        buffer[i] = item
+    rng.shuffle(buffer)
+    for item in buffer:
+        yield item
+
+
+def encode_words(wordlist, char_to_ix, max_word_len):
+    """Encode a list of words as a padded matrix of character indices.
+
+    The lookup runs on the words' Unicode code points with NumPy instead of
+    a Python loop over every character.
+
+    Parameters
+    ----------
+    wordlist : list of strings
+        The words to encode.
+    char_to_ix : dict
+        Maps every character that appears in the words to its index.
+    max_word_len : int
+        Words are truncated to this length.
+
+    Returns
+    -------
+    numpy array : A ``(len(wordlist), max_word_len)`` int32 matrix. Positions
+        after the end of a word are padded with -1.
+    """
+
+    lengths = np.array([min(len(word), max_word_len) for word in wordlist],
+                       dtype=int)
+    text = ('').join(word[:max_word_len] for word in wordlist)
+    codepoints = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+    keys = np.array(sorted(ord(char) for char in char_to_ix),
+                    dtype=np.uint32)
+    values = np.array([char_to_ix[chr(key)] for key in keys], dtype=np.int32)
+    pos = np.minimum(np.searchsorted(keys, codepoints), len(keys) - 1)
+    unknown = keys[pos] != codepoints
+    if np.any(unknown):
+        raise ValueError('Unknown character: ' +
+                         repr(chr(codepoints[unknown][0])))
+
+    # Row and column of every character in the padded matrix:
+    rows = np.repeat(np.arange(len(wordlist)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    cols = np.arange(len(codepoints)) - np.repeat(starts, lengths)
+
+    seqs = np.full((len(wordlist), max_word_len), -1, dtype=np.int32)
+    seqs[rows, cols] = values[pos]
+    return seqs
+
+
+def previous_char_inputs(seqs):
+    """Shift encoded words by one position, so that position ``j`` holds the
+    character preceding position ``j``. Position 0 holds -1, the start of a
+    word, so that the network learns the distribution of first characters.
+
+    Parameters
+    ----------
+    seqs : numpy array
+        A padded index matrix as returned by :func:`encode_words`.
+
+    Returns
+    -------
+    numpy array : A matrix of the same shape, padded with -1.
+    """
+
+    inputs = np.full_like(seqs, -1)
+    inputs[:, 1:] = seqs[:, :-1]
+    return inputs
+
+
+def one_hot(seqs, vocab_size):
+    """One-hot encode a padded index matrix.
+
+    Parameters
+    ----------
+    seqs : numpy array
+        A padded index matrix as returned by :func:`encode_words`.
+    vocab_size : int
+        The number of distinct characters.
+
+    Returns
+    -------
+    numpy array : A float32 array of shape ``seqs.shape + (vocab_size,)``.
+        Padded positions are all-zero vectors.
+    """
+
+    X = np.zeros(seqs.shape + (vocab_size,), dtype=np.float32)
+    mask = seqs >= 0
+    X[mask, seqs[mask]] = 1
+    return X
+
+
+def length_buckets(lengths, batch_size, random_state=None):
+    """Split words into batches of similar length, in random order.
+
+    Every batch then only needs to be padded to its own longest word,
+    instead of all batches to the longest word of the corpus.
+
+    Parameters
+    ----------
+    lengths : numpy array
+        The length of every word.
+    batch_size : int
+        The number of words per batch. The last batch may be smaller.
+    random_state : numpy.random.RandomState, optional
+        The random number generator to draw from. If None, the global
+        ``np.random`` generator is used.
+
+    Returns
+    -------
+    list : One index array per batch.
+    """
+
+    rng = np.random if random_state is None else random_state
+    # Sort by length, and randomly among words of the same length:
+    order = np.lexsort((rng.random_sample(len(lengths)), lengths))
+    batches = [order[i:i + batch_size]
+               for i in range(0, len(order), batch_size)]
+    return [batches[i] for i in rng.permutation(len(batches))]
+
+
+def _bucket(char, n_buckets):
+    # A hash that is stable across processes, unlike hash():
+    return zlib.crc32(char.encode('utf-8')) % n_buckets
+
+
+def cap_vocabulary(char_counts, max_vocab_size, n_buckets=1):
+    """Choose a character vocabulary of bounded size.
+
+    The most frequent characters are kept. The rare ones are hashed into
+    ``n_buckets`` buckets, and each bucket is represented by its most
+    frequent character. Use :func:`map_rare_chars` to replace every rare
+    character by its bucket's representative.
+
+    Parameters
+    ----------
+    char_counts : collections.Counter
+        How often every character occurs in the corpus. The newline is
+        always part of the vocabulary.
+    max_vocab_size : int
+        The maximum number of characters, including the newline and the
+        representatives.
+    n_buckets : int
+        The number of buckets for rare characters.
+
+    Returns
+    -------
+    tuple : The sorted list of characters, and the list of the buckets'
+        representatives, with None for empty buckets.
+    """
+
+    counts = collections.Counter(char_counts)
+    counts['\n'] = float('inf')
+
+    if len(counts) <= max_vocab_size:
+        return sorted(counts), [None] * n_buckets
+
+    n_keep = max_vocab_size - n_buckets
+    if n_keep < 1:
+        raise ValueError('max_vocab_size must be larger than the number '
+                         'of buckets')
+    ranked = [char for char, _ in counts.most_common()]
+    bucket_chars = [None] * n_buckets
+    for char in ranked[n_keep:]:
+        bucket = _bucket(char, n_buckets)
+        # The ranking is by frequency, so the first one is the most common
+        if bucket_chars[bucket] is None:
+            bucket_chars[bucket] = char
+
+    chars = set(ranked[:n_keep])
+    chars.update(char for char in bucket_chars if char is not None)
+    return sorted(chars), bucket_chars
+
+
+def map_rare_chars(words, chars, bucket_chars):
+    """Replace the characters that are not in a vocabulary by their
+    bucket's representative, see :func:`cap_vocabulary`.
+
+    Characters whose bucket is empty are kept, so that encoding them
+    fails loudly.
+
+    Returns
+    -------
+    list : The mapped words.
+    """
+
+    if not any(char is not None for char in bucket_chars):
+        return list(words)
+    known = set(chars)
+    table = {}
+    mapped = []
+    for word in words:
+        for char in word:
+            if char not in known and ord(char) not in table:
+                bucket_char = bucket_chars[_bucket(char, len(bucket_chars))]
+                table[ord(char)] = bucket_char or char
+        mapped.append(word.translate(table))
+    return mapped
+
+
+def process_wordlist(words, max_vocab_size=None, n_buckets=1):
+    """Turn a raw list of words into a training corpus.
+
+    Parameters
+    ----------
+    words : list of strings
+        The words, e.g. from :func:`read_wordlist_file`.
+    max_vocab_size : int or None
+        If set, rare characters are mapped to shared buckets, see
+        :func:`cap_vocabulary`.
+    n_buckets : int
+        The number of buckets for rare characters.
+
+    Returns
+    -------
+    tuple : The sorted unique words, without surrounding whitespace, the
+        sorted list of characters, including the newline, and the list of
+        the buckets' representatives.
+    """
+
+    words = set(word.strip() for word in words)
+    if max_vocab_size is None:
+        chars = sorted(set('\n').union(*words))
+        return sorted(words), chars, [None] * n_buckets
+
+    counts = collections.Counter()
+    for word in words:
+        counts.update(word)
+    chars, bucket_chars = cap_vocabulary(counts, max_vocab_size, n_buckets)
+    # Mapping can turn different words into the same one:
+    words = set(map_rare_chars(words, chars, bucket_chars))
+    return sorted(words), chars, bucket_chars
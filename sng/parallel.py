@@ -0,0 +1,91 @@
+"""The parallel module. Simulates names on several CPU cores.
+
+Every worker process loads the model once, as a :class:`sng.Sampler` from a
+folder written by :meth:`sng.Generator.save`, so the workers neither import
+Keras nor need to be sent the model.
+"""
+
+import multiprocessing
+
+import numpy as np
+
+from .Sampler import Sampler
+from .sampling import generate_words
+
+# The sampler of the current worker process, set by _init_worker:
+_sampler = None
+
+
+def _init_worker(directory):
+    global _sampler
+    _sampler = Sampler.load(directory)
+
+
+def _sample_shard(args):
+    size, seed, kwargs = args
+    return generate_words(_sampler, size, _sampler.ix_to_char,
+                          random_state=np.random.RandomState(seed),
+                          **kwargs)
+
+
+def make_pool(directory, workers):
+    """Start a pool of worker processes that each load the model stored in
+    ``directory``.
+
+    Parameters
+    ----------
+    directory : str
+        A folder written by :meth:`sng.Generator.save`, or by
+        :meth:`sng.Sampler.save`.
+    workers : int
+        The number of processes.
+
+    Returns
+    -------
+    multiprocessing.pool.Pool : The pool. Close it when you're done.
+    """
+
+    return multiprocessing.Pool(workers, initializer=_init_worker,
+                                initargs=(directory,))
+
+
+def split_evenly(n, k):
+    """Split ``n`` into at most ``k`` positive parts that differ by at most
+    one.
+    """
+
+    return [n // k + (1 if i < n % k else 0) for i in range(min(n, k))]
+
+
+def sample_parallel(pool, n, workers, random_state=None, **kwargs):
+    """Sample ``n`` words, split into one shard per worker.
+
+    Every shard gets its own random seed, drawn from ``random_state``.
+    Since the shards are merged in order, the result only depends on
+    ``random_state``, not on how the processes are scheduled.
+
+    Parameters
+    ----------
+    pool : multiprocessing.pool.Pool
+        A pool from :func:`make_pool`.
+    n : int
+        The number of words to sample.
+    workers : int
+        The number of shards, usually the number of processes in the pool.
+    random_state : numpy.random.RandomState, optional
+        Draws the shards' seeds. If None, the global ``np.random``
+        generator is used.
+    **kwargs
+        Passed on to :func:`sng.sampling.generate_words`.
+
+    Returns
+    -------
+    list : The ``n`` sampled words.
+    """
+
+    rng = np.random if random_state is None else random_state
+    sizes = split_evenly(n, workers)
+    seeds = rng.randint(2**31 - 1, size=len(sizes))
+    shards = pool.map(_sample_shard, [(size, seed, kwargs)
+                                      for size, seed in zip(sizes, seeds)])
+    return [word for shard in shards for word in shard]
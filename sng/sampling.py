@@ -0,0 +1,506 @@
+"""The sampling module. Generates words from a trained character model.
+
+The functions in here don't care how the model is implemented. They work on
+a *decoder*, i.e. any object with two methods:
+
+``initial_state(n)``
+    Returns a list of arrays with the initial recurrent state for ``n``
+    words. Every array has one row per word.
+
+``step(ix, states)``
+    Takes the ``(n,)`` integer array of the previous characters (with -1
+    meaning "no previous character", i.e. the start of a word) and the
+    current states. Returns a ``(n, vocab_size)`` array of next-character
+    probabilities and the updated list of states.
+"""
+
+import numpy as np
+
+from .helpers import truncate_logits, sample_gumbel, encode_words
+
+
+def generate_words(decoder, n, ix_to_char, temperature=1.0, min_word_len=4,
+                   max_word_len=12, startswith='', endswith='',
+                   banned_chars='', top_k=None, top_p=None,
+                   random_state=None):
+    """Sample ``n`` words at once.
+
+    All words are advanced together, one step per character position. Words
+    that have already sampled their end-of-word token are dropped from the
+    batch.
+
+    All constraints are applied by masking the next-character
+    distributions before sampling, so every draw succeeds at once: the
+    end-of-word token is masked out while a word is shorter than
+    ``min_word_len`` and is the only option once it reaches
+    ``max_word_len``.
+
+    Sampling runs in log space: the temperature scales the log
+    probabilities, masked characters get ``-inf``, and the Gumbel-max trick
+    draws all words' characters in one vectorized operation. Zero
+    probabilities and very low temperatures are therefore safe.
+
+    Parameters
+    ----------
+    decoder : object
+        A decoder as described in the module docstring.
+    n : int
+        The number of words to sample.
+    ix_to_char : dict
+        Maps the decoder's output indices to characters. Index 0 must be
+        the end-of-word token, i.e. the newline.
+    temperature : float or numpy array
+        Sampling temperature. Either one value for all words, or a
+        ``(n,)`` array with one value per word.
+    min_word_len : int or numpy array
+        Minimum word length of the sampled words, for all or per word.
+    max_word_len : int or numpy array
+        Maximum word length of the sampled words, for all or per word.
+    startswith : str
+        Every word starts with these characters. They are fed through the
+        model, so the rest of the word is sampled conditional on them.
+    endswith : str
+        Every word ends with these characters. Where the model samples the
+        end-of-word token, the ending is inserted instead. The ending
+        counts towards the word length.
+    banned_chars : str
+        Characters that must not be sampled.
+    top_k : int or None
+        Only sample from the ``top_k`` most likely characters at every
+        step, see :func:`sng.helpers.truncate_logits`.
+    top_p : float or None
+        Only sample from the most likely characters whose total
+        probability is at least ``top_p``.
+    random_state : numpy.random.RandomState, optional
+        The random number generator to draw from. If None, the global
+        ``np.random`` generator is used.
+
+    Returns
+    -------
+    list : A list of ``n`` strings, each starting with an uppercase letter.
+    """
+
+    char_to_ix = {char: ix for ix, char in ix_to_char.items()}
+    prefix = _lookup(char_to_ix, startswith)
+    ending = _lookup(char_to_ix, endswith)
+
+    allowed = np.ones(len(ix_to_char), dtype=bool)
+    for char in banned_chars:
+        if char in char_to_ix and char_to_ix[char] != 0:
+            allowed[char_to_ix[char]] = False
+
+    # Per-word options, as one row each:
+    temperature = np.broadcast_to(
+        np.asarray(temperature, dtype=float), (n,))[:, np.newaxis]
+    min_word_len = np.broadcast_to(np.asarray(min_word_len, dtype=int), (n,))
+    max_word_len = np.broadcast_to(np.asarray(max_word_len, dtype=int), (n,))
+    if n and len(prefix) + len(ending) > np.min(max_word_len):
+        raise ValueError('startswith and endswith are longer than '
+                         'max_word_len')
+
+    # At position 0, there is no previous character. The decoder then
+    # returns the distribution of the first character.
+    ix = -np.ones(n, dtype=int)
+    states = decoder.initial_state(n)
+    sampled = np.zeros((n, np.max(max_word_len) if n else 0), dtype=int)
+    active = np.arange(n)
+
+    for i in range(sampled.shape[1]):
+        probs, states = decoder.step(ix, states)
+
+        if i < len(prefix):
+            ix = np.full(len(active), prefix[i], dtype=int)
+        else:
+            mask = np.tile(allowed, (len(active), 1))
+            # The first character must not be a newline (i.e. index 0), and
+            # words must not end before they are min_word_len long...
+            if i == 0:
+                mask[:, 0] = False
+            else:
+                mask[i + len(ending) < min_word_len[active], 0] = False
+            # ...but must end when there's just enough room for the ending:
+            must_end = i + len(ending) >= max_word_len[active]
+            mask[must_end] = False
+            mask[must_end, 0] = True
+
+            with np.errstate(divide='ignore'):
+                logits = np.log(probs) / temperature[active]
+            logits = _apply_mask(logits, mask)
+            if top_k is not None or top_p is not None:
+                logits = truncate_logits(logits, top_k, top_p)
+            ix = sample_gumbel(logits, random_state)
+
+        sampled[active, i] = ix
+        finished = ix == 0
+        if ending and np.any(finished):
+            rows = active[finished][:, np.newaxis]
+            sampled[rows, i + np.arange(len(ending))] = ending
+
+        # Only keep going with the words that are not finished yet:
+        keep = ~finished
+        active = active[keep]
+        if len(active) == 0:
+            break
+        ix = ix[keep]
+        states = [state[keep] for state in states]
+
+    return [_decode(row, ix_to_char) for row in sampled]
+
+
+def best_words(decoder, n, ix_to_char, min_word_len=4, max_word_len=12,
+               startswith='', banned_chars='', beam_width=None):
+    """Find the ``n`` most likely words with a beam search.
+
+    All partial words are advanced together, one step per character
+    position, as in :func:`generate_words`. At every position, each of
+    them is extended by every allowed character, and only the
+    ``beam_width`` most likely extensions are kept. Extensions by the
+    end-of-word token are collected as finished words. Since the log
+    probability of a word only drops as it grows, the search stops as soon
+    as no partial word can beat the ``n``-th best finished one.
+
+    Parameters
+    ----------
+    decoder : object
+        A decoder as described in the module docstring.
+    n : int
+        The number of words to find.
+    ix_to_char : dict
+        Maps the decoder's output indices to characters. Index 0 must be
+        the end-of-word token, i.e. the newline.
+    min_word_len : int
+        Minimum word length of the words.
+    max_word_len : int
+        Maximum word length of the words.
+    startswith : str
+        Every word starts with these characters. Their probability counts
+        towards the words' log probabilities.
+    banned_chars : str
+        Characters that must not appear in the words.
+    beam_width : int or None
+        The number of partial words to keep at every position. Defaults to
+        ``n``. Wider beams find likelier words, at a higher cost.
+
+    Returns
+    -------
+    list : Up to ``n`` tuples of a word, starting with an uppercase letter,
+        and its log probability under the model, including the end-of-word
+        token. The most likely word comes first.
+    """
+
+    if beam_width is None:
+        beam_width = n
+    char_to_ix = {char: ix for ix, char in ix_to_char.items()}
+    prefix = _lookup(char_to_ix, startswith)
+    if len(prefix) > max_word_len:
+        raise ValueError('startswith is longer than max_word_len')
+
+    allowed = np.ones(len(ix_to_char), dtype=bool)
+    for char in banned_chars:
+        if char in char_to_ix and char_to_ix[char] != 0:
+            allowed[char_to_ix[char]] = False
+
+    ix = -np.ones(1, dtype=int)
+    states = decoder.initial_state(1)
+    sampled = np.zeros((1, 0), dtype=int)
+    scores = np.zeros(1)
+    words = []
+    word_scores = np.zeros(0)
+
+    # Position max_word_len only takes the end-of-word token:
+    for i in range(max_word_len + 1):
+        probs, states = decoder.step(ix, states)
+
+        if i < len(prefix):
+            mask = np.zeros(len(ix_to_char), dtype=bool)
+            mask[prefix[i]] = True
+        elif i >= max_word_len:
+            mask = np.zeros(len(ix_to_char), dtype=bool)
+            mask[0] = True
+        else:
+            mask = allowed.copy()
+            mask[0] = i > 0 and i >= min_word_len
+        with np.errstate(divide='ignore'):
+            candidates = scores[:, np.newaxis] + \
+                np.where(mask, np.log(probs), -np.inf)
+
+        # Collect the finished words, and keep the n best ones so far:
+        ended = np.isfinite(candidates[:, 0])
+        if np.any(ended):
+            words += [_decode(row, ix_to_char) for row in sampled[ended]]
+            word_scores = np.concatenate([word_scores,
+                                          candidates[ended, 0]])
+            if len(words) > n:
+                best = np.argsort(-word_scores, kind='stable')[:n]
+                words = [words[j] for j in best]
+                word_scores = word_scores[best]
+        candidates[:, 0] = -np.inf
+
+        # The most likely extensions that can still make it into the top n:
+        flat = candidates.ravel()
+        threshold = -np.inf
+        if len(words) >= n:
+            threshold = np.min(word_scores)
+        keep = np.flatnonzero(flat > threshold)
+        if len(keep) > beam_width:
+            keep = keep[np.argpartition(-flat[keep], beam_width - 1)
+                        [:beam_width]]
+        if len(keep) == 0:
+            break
+        rows, ix = np.divmod(keep, len(ix_to_char))
+        sampled = np.hstack([sampled[rows], ix[:, np.newaxis]])
+        scores = flat[keep]
+        states = [state[rows] for state in states]
+
+    order = np.argsort(-word_scores, kind='stable')
+    return [(words[j], float(word_scores[j])) for j in order]
+
+
+def log_likelihood(decoder, words, char_to_ix):
+    """Compute the log probability of many words under a model.
+
+    All words are fed through the decoder together, one step per character
+    position. Words that have ended are dropped from the batch.
+
+    Parameters
+    ----------
+    decoder : object
+        A decoder as described in the module docstring.
+    words : list of strings
+        The words to score. Characters that are not in the vocabulary are
+        looked up in lowercase, since word corpora are lowercased.
+    char_to_ix : dict
+        Maps characters to the decoder's output indices. Index 0 must be
+        the end-of-word token, i.e. the newline.
+
+    Returns
+    -------
+    numpy array : The ``(len(words),)`` log probabilities, including the
+        end-of-word token. Words with characters that are not in the
+        vocabulary get ``-inf``.
+    """
+
+    if not words:
+        return np.zeros(0)
+
+    # Every character of the words, mapped like in _lookup(), or to -2 if
+    # it is unknown:
+    lookup = {}
+    for char in set(('').join(words)):
+        lookup[char] = char_to_ix.get(char, char_to_ix.get(char.lower(), -2))
+    lookup['\n'] = 0
+    seqs = encode_words([word + '\n' for word in words], lookup,
+                        max(len(word) for word in words) + 1)
+    unknown = np.any(seqs == -2, axis=1)
+    seqs[unknown] = -1
+    seqs[unknown, 0] = 0
+
+    scores = np.zeros(len(words))
+    ix = -np.ones(len(words), dtype=int)
+    states = decoder.initial_state(len(words))
+    active = np.arange(len(words))
+    for i in range(seqs.shape[1]):
+        probs, states = decoder.step(ix, states)
+        ix = seqs[active, i]
+        with np.errstate(divide='ignore'):
+            scores[active] += np.log(probs[np.arange(len(active)), ix])
+
+        keep = ix != 0
+        active = active[keep]
+        if len(active) == 0:
+            break
+        ix = ix[keep]
+        states = [state[keep] for state in states]
+
+    scores[unknown] = -np.inf
+    return scores
+
+
+def _decode(row, ix_to_char):
+    """Convert a row of indices to a word starting with an uppercase
+    letter.
+    """
+
+    word = ('').join(ix_to_char[ix] for ix in row if ix != 0)
+    return word[:1].upper() + word[1:]
+
+
+def _lookup(char_to_ix, chars):
+    """Convert a string to a list of indices. Falls back to lowercase,
+    since word corpora are lowercased.
+    """
+
+    indices = []
+    for char in chars:
+        if char not in char_to_ix:
+            char = char.lower()
+        if char not in char_to_ix:
+            raise ValueError('The character ' + repr(char) +
+                             ' is not in the vocabulary')
+        indices.append(char_to_ix[char])
+    return indices
+
+
+def _apply_mask(logits, mask):
+    """Set the masked characters' logits to ``-inf``. If the model put all
+    its mass on masked characters, fall back to a uniform distribution
+    over the allowed ones.
+    """
+
+    logits = np.where(mask, logits, -np.inf)
+    empty = np.all(np.isneginf(logits), axis=-1)
+    if np.any(empty):
+        logits[empty] = np.where(mask[empty], 0, -np.inf)
+    return logits
+
+
+def collect_words(sample, n, unique=False, is_known=None, patience=10):
+    """Sample words in batches until there are ``n`` acceptable ones.
+
+    Every batch is oversampled by the rejection rate observed so far, so
+    that typically one or two batches suffice.
+
+    Parameters
+    ----------
+    sample : callable
+        Takes a number of words and returns a list of that many sampled
+        words, e.g. a wrapper around :func:`generate_words`.
+    n : int
+        The number of words to collect.
+    unique : bool
+        If True, reject words that were already collected (ignoring case).
+    is_known : callable, optional
+        Takes a list of words and returns a boolean array, True for the
+        words to reject, e.g. because they appear in the training corpus.
+    patience : int
+        Give up after this many consecutive batches without a single
+        acceptable word. This is the diversity ceiling: at low
+        temperatures, the model may not be able to produce ``n`` distinct
+        words at all.
+
+    Returns
+    -------
+    tuple : The list of at most ``n`` collected words, and a dict with the
+        counts ``n_sampled``, ``n_known`` and ``n_duplicates``, plus
+        ``exhausted``, which is True if the search was given up.
+    """
+
+    stats = {}
+    words = []
+    for batch in iter_collect_words(sample, n, max(n, 1), unique=unique,
+                                    is_known=is_known, patience=patience,
+                                    stats=stats):
+        words += batch
+    return words, stats
+
+
+MAX_DRAW = 10000
+"""int: :func:`iter_collect_words` samples at most this many words, divided
+by the acceptance rate, at once, unless the batches are larger.
+"""
+
+
+def iter_collect_words(sample, n=None, batch_size=10000, unique=False,
+                       is_known=None, patience=10, stats=None, seen=None):
+    """Sample words until there are ``n`` acceptable ones, and yield them
+    in batches of ``batch_size``.
+
+    This is the streaming version of :func:`collect_words`. The words are
+    sampled in the same draws, independent of ``batch_size``, so both
+    find the same words for the same random state. Acceptable words that
+    don't fit into the current batch are kept for the next one.
+
+    Parameters
+    ----------
+    sample : callable
+        Takes a number of words and returns a list of that many sampled
+        words.
+    n : int or None
+        The number of words to collect. If None, words are collected until
+        the caller stops, or until the model is exhausted.
+    batch_size : int
+        The number of words per batch. The last batch may be smaller.
+    unique : bool
+        If True, reject words that were already collected (ignoring case).
+    is_known : callable, optional
+        Takes a list of words and returns a boolean array, True for the
+        words to reject.
+    patience : int
+        Give up after this many consecutive draws without a single
+        acceptable word.
+    stats : dict, optional
+        Filled with the same counts as returned by :func:`collect_words`.
+    seen : object, optional
+        Tracks the collected words if ``unique`` is set, e.g. a
+        :class:`sng.BloomFilter` to save memory. It needs an
+        ``update(words)`` method that adds the words and returns a boolean
+        array, True for the words that were not in it before, and not
+        repeated earlier in ``words``. Defaults to an exact set.
+
+    Yields
+    ------
+    list : A batch of collected words.
+    """
+
+    if stats is None:
+        stats = {}
+    stats.update({'n_sampled': 0, 'n_known': 0, 'n_duplicates': 0,
+                  'exhausted': False})
+    if unique and seen is None:
+        seen = _WordSet()
+
+    n_collected = 0
+    pending = []
+    n_fruitless = 0
+    while n is None or n_collected < n:
+        n_missing = np.inf if n is None else n - n_collected
+        # Oversample by the acceptance rate observed so far, but don't let
+        # a bad first batch blow up the batch size:
+        acceptance = 1.0
+        if stats['n_sampled']:
+            acceptance = max(n_collected / stats['n_sampled'], 0.1)
+        size = min(n_missing, max(batch_size, MAX_DRAW))
+        batch = sample(int(np.ceil(size / acceptance)))
+        stats['n_sampled'] += len(batch)
+
+        if is_known is not None:
+            known = is_known(batch)
+            stats['n_known'] += int(np.sum(known))
+            batch = [word for word, k in zip(batch, known) if not k]
+        if unique:
+            is_new = seen.update([word.lower() for word in batch])
+            stats['n_duplicates'] += int(np.sum(~is_new))
+            batch = [word for word, new in zip(batch, is_new) if new]
+        if n is not None:
+            batch = batch[:int(n_missing)]
+        pending += batch
+        n_collected += len(batch)
+
+        while len(pending) >= batch_size:
+            yield pending[:batch_size]
+            pending = pending[batch_size:]
+
+        n_fruitless = n_fruitless + 1 if len(batch) == 0 else 0
+        if (n is None or n_collected < n) and n_fruitless >= patience:
+            stats['exhausted'] = True
+            break
+
+    if pending:
+        yield pending
+
+
+class _WordSet:
+    """A set of words with the ``update()`` method of
+    :class:`sng.BloomFilter`.
+    """
+
+    def __init__(self):
+        self.words = set()
+
+    def update(self, words):
+        is_new = np.zeros(len(words), dtype=bool)
+        for i, word in enumerate(words):
+            if word not in self.words:
+                self.words.add(word)
+                is_new[i] = True
+        return is_new
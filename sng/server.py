@@ -0,0 +1,284 @@
+"""The server module. Serves name suggestions over HTTP.
+
+Start it on a folder written by :meth:`sng.Generator.save`::
+
+    sng-server my_model --port 8000
+
+and ask for names::
+
+    curl 'http://localhost:8000/names?n=5&temperature=0.8&suffix=%20Labs'
+
+The query parameters ``n``, ``temperature``, ``min_word_len``,
+``max_word_len`` and ``suffix`` are all optional and default to the values
+in the model's config. The response is a JSON object with a ``names`` list.
+
+Given a folder of saved generators instead, the server serves all of them
+through a :class:`sng.Registry`, and the ``model`` parameter picks one by
+its folder name::
+
+    sng-server my_models/ --max-loaded 16
+    curl 'http://localhost:8000/names?model=pokemon&n=5'
+
+The model is loaded once, as a :class:`sng.Sampler`, so the server doesn't
+need Keras. Requests that arrive within a short time window are coalesced
+into one batch, so that many concurrent clients share the same forward
+passes instead of each running their own.
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from .Sampler import Sampler
+from .Registry import Registry
+from .sampling import generate_words
+
+
+class _BadRequest(Exception):
+    pass
+
+
+class NameServer:
+    """An asyncio HTTP server with request micro-batching.
+
+    Parameters
+    ----------
+    sampler : sng.Sampler or sng.Registry
+        The model to sample names from, or a registry of models to pick
+        from with the ``model`` query parameter.
+    batch_window : float
+        How long to wait for more requests to join a batch, in seconds.
+    max_names : int
+        The maximum number of names per request.
+    max_word_len : int
+        The maximum ``max_word_len`` a request may ask for. The sampling
+        cost grows with it, so it is capped like ``n``.
+    """
+
+    def __init__(self, sampler, batch_window=0.005, max_names=100,
+                 max_word_len=30):
+        self.sampler = sampler
+        self.batch_window = batch_window
+        self.max_names = max_names
+        self.max_word_len = max_word_len
+        self.queue = None
+
+    def _get_sampler(self, model):
+        if isinstance(self.sampler, Registry):
+            return self.sampler.get(model).to_sampler()
+        return self.sampler
+
+    def _parse_options(self, query):
+        """Turn the query parameters into sampling options."""
+
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        model = params.get('model')
+        if isinstance(self.sampler, Registry) and model not in self.sampler:
+            raise _BadRequest('Unknown model: ' + repr(model))
+        config = self._get_sampler(model).config
+        try:
+            options = {
+                'model': model,
+                'n': int(params.get('n', 10)),
+                'temperature': float(params.get('temperature',
+                                                config.temperature)),
+                'min_word_len': int(params.get('min_word_len',
+                                               config.min_word_len)),
+                'max_word_len': int(params.get('max_word_len',
+                                               config.max_word_len)),
+                'suffix': params.get('suffix', config.suffix),
+            }
+        except ValueError as e:
+            raise _BadRequest(str(e))
+
+        if not 0 < options['n'] <= self.max_names:
+            raise _BadRequest('n must be between 1 and ' +
+                              str(self.max_names))
+        if options['temperature'] <= 0:
+            raise _BadRequest('temperature must be positive')
+        if not 1 <= options['min_word_len'] <= options['max_word_len']:
+            raise _BadRequest('Need 1 <= min_word_len <= max_word_len')
+        if options['max_word_len'] > self.max_word_len:
+            raise _BadRequest('max_word_len must be at most ' +
+                              str(self.max_word_len))
+        return options
+
+    def _sample_batch(self, requests):
+        """Sample the names for a list of requests, in one batch per
+        model."""
+
+        by_model = collections.OrderedDict()
+        for i, r in enumerate(requests):
+            by_model.setdefault(r['model'], []).append(i)
+
+        results = [None] * len(requests)
+        for model, indices in by_model.items():
+            names = self._sample_model_batch(
+                self._get_sampler(model), [requests[i] for i in indices])
+            for i, result in zip(indices, names):
+                results[i] = result
+        return results
+
+    def _sample_model_batch(self, sampler, requests):
+        temperature = np.repeat([r['temperature'] for r in requests],
+                                [r['n'] for r in requests])
+        min_word_len = np.repeat([r['min_word_len'] for r in requests],
+                                 [r['n'] for r in requests])
+        max_word_len = np.repeat([r['max_word_len'] for r in requests],
+                                 [r['n'] for r in requests])
+        words = generate_words(sampler, len(temperature),
+                               sampler.ix_to_char,
+                               temperature=temperature,
+                               min_word_len=min_word_len,
+                               max_word_len=max_word_len,
+                               top_k=sampler.config.top_k,
+                               top_p=sampler.config.top_p)
+
+        results = []
+        start = 0
+        for r in requests:
+            results.append([word + r['suffix']
+                            for word in words[start:start + r['n']]])
+            start += r['n']
+        return results
+
+    async def _batch_loop(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            # Wait for a request, then give others a moment to join:
+            batch = [await self.queue.get()]
+            await asyncio.sleep(self.batch_window)
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            requests = [options for options, _ in batch]
+            try:
+                # Sample in a thread, so the server keeps accepting
+                # requests in the meantime:
+                results = await loop.run_in_executor(
+                    None, self._sample_batch, requests)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), names in zip(batch, results):
+                if not future.done():
+                    future.set_result(names)
+
+    async def suggest(self, options):
+        """Queue a request and wait for its batch to be sampled.
+
+        Returns
+        -------
+        list : The names.
+        """
+
+        future = asyncio.get_event_loop().create_future()
+        await self.queue.put((options, future))
+        return await future
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            # Skip the headers:
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+
+            try:
+                method, target, _ = request_line.decode('latin-1').split()
+            except ValueError:
+                raise _BadRequest('Malformed request line')
+            url = urlsplit(target)
+            if method != 'GET' or url.path != '/names':
+                status, body = '404 Not Found', {'error': 'Not found'}
+            else:
+                names = await self.suggest(self._parse_options(url.query))
+                status, body = '200 OK', {'names': names}
+        except _BadRequest as e:
+            status, body = '400 Bad Request', {'error': str(e)}
+        except Exception as e:
+            status, body = '500 Internal Server Error', {'error': str(e)}
+
+        payload = json.dumps(body).encode('utf-8')
+        writer.write(('HTTP/1.1 ' + status + '\r\n'
+                      'Content-Type: application/json\r\n'
+                      'Content-Length: ' + str(len(payload)) + '\r\n'
+                      'Connection: close\r\n\r\n').encode('latin-1'))
+        writer.write(payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """Start serving on the running event loop.
+
+        Returns
+        -------
+        asyncio.AbstractServer : The server.
+        """
+
+        self.queue = asyncio.Queue()
+        self._batcher = asyncio.ensure_future(self._batch_loop())
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def stop(self):
+        """Stop the batching task started by :meth:`start`."""
+
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+
+
+def main(args=None):
+    """Entry point of the ``sng-server`` command."""
+
+    parser = argparse.ArgumentParser(
+        description='Serve name suggestions from a saved sng model.')
+    parser.add_argument('directory',
+                        help='A folder written by sng.Generator.save(), '
+                        'or a folder of such folders')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--batch-window', type=float, default=0.005,
+                        help='Seconds to wait for requests to batch up')
+    parser.add_argument('--max-names', type=int, default=100,
+                        help='Maximum number of names per request')
+    parser.add_argument('--max-word-len', type=int, default=30,
+                        help='Maximum max_word_len a request may ask for')
+    parser.add_argument('--max-loaded', type=int, default=8,
+                        help='Maximum number of models to keep loaded, '
+                        'when serving a folder of models')
+    args = parser.parse_args(args)
+
+    if os.path.exists(os.path.join(args.directory, 'manifest.json')) or \
+            os.path.isdir(os.path.join(args.directory, 'inference')):
+        sampler = Sampler.load(args.directory, mmap_mode='r')
+    else:
+        sampler = Registry(args.directory, max_loaded=args.max_loaded)
+    server = NameServer(sampler,
+                        batch_window=args.batch_window,
+                        max_names=args.max_names,
+                        max_word_len=args.max_word_len)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(server.start(args.host, args.port))
+    print('Serving names on http://' + args.host + ':' + str(args.port) +
+          '/names')
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
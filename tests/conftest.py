@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+import sng
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmpdir, monkeypatch):
+    # Keep the corpus cache of the tests out of the user's cache folder
+    monkeypatch.setenv('SNG_CACHE_DIR', str(tmpdir.join('cache')))
+    return str(tmpdir.join('cache'))
+
+
+@pytest.fixture
+def ngram_generator():
+    # A generator that trains in milliseconds, for tests of the Generator
+    # API that don't depend on the backend
+    cfg = sng.Config(backend='ngram', ngram_order=3, verbose=False,
+                     suffix=' Inc')
+    gen = sng.Generator(config=cfg, wordlist=['alpha', 'beta', 'gamma',
+                                              'delta', 'epsilon'])
+    gen.fit()
+    return gen
+
+
+@pytest.fixture
+def make_sampler():
+    # Builds a Sampler with random weights, without training a model
+    def make(hidden_dim=8, n_layers=2, chars=None, **config):
+        rng = np.random.RandomState(0)
+        if chars is None:
+            chars = ['\n'] + list('abcdefgh')
+        input_dim = len(chars)
+        weights = {}
+        for i in range(n_layers):
+            prefix = 'lstm_' + str(i) + '_'
+            weights[prefix + 'kernel'] = rng.randn(input_dim, 4 * hidden_dim)
+            weights[prefix + 'recurrent_kernel'] = rng.randn(
+                hidden_dim, 4 * hidden_dim)
+            weights[prefix + 'bias'] = rng.randn(4 * hidden_dim)
+            input_dim = hidden_dim
+        weights['dense_kernel'] = rng.randn(hidden_dim, len(chars))
+        weights['dense_bias'] = rng.randn(len(chars))
+        return sng.Sampler(sng.Config(**config), chars, weights)
+    return make
+
+
+@pytest.fixture
+def save_ngram_models():
+    # Saves one n-gram generator per name into a folder, each with the
+    # name as its suffix
+    def save(root, names):
+        for name in names:
+            cfg = sng.Config(backend='ngram', verbose=False,
+                             suffix=' ' + name)
+            gen = sng.Generator(config=cfg,
+                                wordlist=['alpha', 'beta', name])
+            gen.fit()
+            gen.save(os.path.join(root, name))
+    return save
@@ -0,0 +1,25 @@
+import os
+
+from sng.cli import main
+
+
+def test_writes_names_to_a_file(tmpdir, capsys, ngram_generator):
+    gen = ngram_generator
+    directory = os.path.join(str(tmpdir), 'model')
+    gen.save(directory)
+
+    output = os.path.join(str(tmpdir), 'names.txt')
+    main([directory, '-n', '50', '--batch-size', '20', '--new',
+          '--suffix', '', '--seed', '0', '--output', output, '--progress'])
+    with open(output) as f:
+        names = f.read().splitlines()
+    assert len(names) == 50
+    assert not any(name.lower() in ['alpha', 'beta', 'gamma', 'delta',
+                                    'epsilon'] for name in names)
+    assert not any(name.endswith(' Inc') for name in names)
+    assert '50/50 names' in capsys.readouterr().err
+
+    main([directory, '-n', '3'])
+    names = capsys.readouterr().out.splitlines()
+    assert len(names) == 3
+    assert all(name.endswith(' Inc') for name in names)
@@ -0,0 +1,398 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+import sng
+
+LATIN = os.path.join(os.path.dirname(sng.__file__), 'wordlists', 'latin.txt')
+
+
+def test_streaming_matches_in_memory():
+    cfg = sng.Config(verbose=False, chunk_size=1000, batch_size=16)
+    gen = sng.Generator(config=cfg, wordlist_file=LATIN)
+    streamed = sng.Generator(config=cfg, wordlist_file=LATIN, streaming=True)
+
+    assert streamed.wordlist is None
+    assert streamed.chars == gen.chars
+    assert streamed.corpus_size == gen.corpus_size
+
+    batches = streamed._stream_batches()
+    n_words = 0
+    for _ in range(int(np.ceil(streamed.corpus_size / 16))):
+        X, Y, sample_weight = next(batches)
+        # Padded to the batch's longest word:
+        assert X.shape[2] == gen.vocab_size
+        assert Y.shape == X.shape[:2] + (1,)
+        assert np.any(X[:, -1])
+        n_words += len(X)
+    assert n_words == gen.corpus_size
+
+
+def test_bloom_filter():
+    seen = sng.BloomFilter(capacity=1000, error_rate=0.01)
+    assert seen.add('alpha')
+    assert not seen.add('alpha')
+    assert 'alpha' in seen
+    assert 'beta' not in seen
+    assert list(seen.update(['beta', 'alpha', 'beta', 'gamma'])) == \
+        [True, False, False, True]
+    assert 'gamma' in seen
+
+
+class FakeKerasModel:
+    def save(self, path):
+        open(path, 'w').close()
+
+
+def test_save_load_roundtrip(tmpdir, make_sampler):
+    cfg = sng.Config(verbose=False, suffix=' Labs')
+    gen = sng.Generator(config=cfg, wordlist=['abc', 'bad', 'head'])
+    gen.model = FakeKerasModel()
+    gen.sampler = make_sampler(chars=gen.chars, suffix=' Labs')
+    directory = os.path.join(str(tmpdir), 'model')
+    gen.save(directory)
+
+    loaded = sng.Generator.load(directory)
+    assert loaded.chars == gen.chars
+    assert loaded.config.suffix == ' Labs'
+    assert loaded.corpus_size == 3
+    # The wordlist is only read on demand:
+    assert loaded._wordlist is None
+    assert loaded.corpus.contains(['abc', 'abd']).tolist() == [True, False]
+    assert not hasattr(loaded, 'novelty_index')
+    assert loaded._is_known(['Bad', 'Dab']).tolist() == [True, False]
+    assert sorted(loaded.wordlist) == sorted(gen.wordlist)
+
+    names = loaded.simulate(5, seed=0)
+    assert len(names) == 5
+    assert all(name.endswith(' Labs') for name in names)
+
+
+def test_corpus(tmpdir):
+    words = ['alpha\n', 'beta\n', 'zoë\n']
+    corpus = sng.Corpus.write(words, str(tmpdir))
+    assert len(corpus) == 3
+    assert sorted(corpus) == ['alpha', 'beta', 'zoë']
+    assert corpus.contains(['zoë', 'zoe', 'beta']).tolist() == \
+        [True, False, True]
+    assert sorted(corpus[i] for i in corpus.with_length(3, 4)) == \
+        ['beta', 'zoë']
+    assert 'alpha' in sng.Corpus(str(tmpdir))
+
+
+def test_corpus_cache(tmpdir, cache_dir):
+    wordlist_file = str(tmpdir.join('words.txt'))
+    with open(wordlist_file, 'w') as f:
+        f.write('Alpha beta, alpha\ngamma')
+
+    cfg = sng.Config(verbose=False)
+    gen = sng.Generator(config=cfg, wordlist_file=wordlist_file)
+    uncached = sng.Generator(config=sng.Config(verbose=False, use_cache=False),
+                             wordlist_file=wordlist_file)
+    assert sorted(gen.wordlist) == sorted(uncached.wordlist)
+    assert gen.chars == uncached.chars
+    assert len(os.listdir(os.path.join(cache_dir, 'corpora'))) == 1
+
+    # A second Generator reuses the entry, a changed file gets a new one:
+    again = sng.Generator(config=cfg, wordlist_file=wordlist_file)
+    assert again.corpus.directory == gen.corpus.directory
+    with open(wordlist_file, 'a') as f:
+        f.write(' delta')
+    changed = sng.Generator(config=cfg, wordlist_file=wordlist_file)
+    assert 'delta\n' in changed.wordlist
+    assert len(os.listdir(os.path.join(cache_dir, 'corpora'))) == 2
+
+    seqs = sng.cache.encoded_corpus(gen.corpus, gen.chars, 8)
+    assert np.array_equal(
+        seqs, sng.helpers.encode_words([w + '\n' for w in gen.corpus],
+                                       gen.char_to_ix, 8))
+    assert np.array_equal(
+        seqs, sng.cache.encoded_corpus(gen.corpus, gen.chars, 8))
+    # The encoded words are cached apart from the corpus, which may belong
+    # to a saved model:
+    assert len(os.listdir(os.path.join(cache_dir, 'encoded'))) == 1
+    assert sorted(os.listdir(gen.corpus.directory)) == \
+        ['hashes.npy', 'lengths.npy', 'offsets.npy', 'vocab.json',
+         'words.bin']
+
+    directory = str(tmpdir.join('model'))
+    gen.corpus.copy(directory)
+    assert sorted(os.listdir(directory)) == \
+        ['hashes.npy', 'lengths.npy', 'offsets.npy', 'words.bin']
+
+
+def test_timing_hooks():
+    cfg = sng.Config(verbose=False, backend='ngram')
+    gen = sng.Generator(config=cfg, wordlist=['abc', 'bad', 'head'])
+    assert 'preprocess' in gen.timings
+
+    calls = []
+    gen.timing_hooks.append(lambda phase, seconds: calls.append(phase))
+    gen.fit()
+    gen.simulate(3)
+    assert calls == ['fit', 'simulate']
+    assert all(gen.timings[phase] >= 0 for phase in calls)
+
+    # The corpus is encoded, and timed, once per fit, not once per batch:
+    seqs = gen._encode_corpus()
+    gen._encode(None, seqs)
+    assert calls == ['fit', 'simulate', 'encode']
+
+
+def test_learning_rate_schedule():
+    cfg = sng.Config(verbose=False, learning_rate=0.01,
+                     lr_schedule=[[20, 0.001], [10, 0.005]])
+    gen = sng.Generator(config=cfg, wordlist=['abc'])
+    assert [gen._learning_rate(epoch) for epoch in [0, 9, 10, 25]] == \
+        [0.01, 0.01, 0.005, 0.001]
+
+
+@pytest.mark.parametrize('embedding_dim', [None, 4])
+def test_step_model_matches_full_model(embedding_dim):
+    pytest.importorskip('keras')
+    cfg = sng.Config(verbose=False, hidden_dim=8, n_layers=2,
+                     embedding_dim=embedding_dim)
+    gen = sng.Generator(config=cfg, wordlist=['alpha', 'beta', 'gamma'])
+    model = gen._build_model()
+    decoder = gen._decoder(gen._build_step_model(model))
+
+    # Every row starts with the start-of-word input, as in sampling:
+    seqs = np.array([[-1, 3, 1, 2], [-1, 2, 2, 1]])
+    if embedding_dim:
+        X = seqs + 1
+    else:
+        X = sng.helpers.one_hot(seqs, gen.vocab_size)
+    expected = model.predict(X)
+
+    states = decoder.initial_state(2)
+    for t in range(seqs.shape[1]):
+        probs, states = decoder.step(seqs[:, t], states)
+        assert np.allclose(probs, expected[:, t], atol=1e-5)
+
+
+def test_bucketed_batches_need_words():
+    gen = sng.Generator(config=sng.Config(verbose=False), wordlist=['abc'])
+    with pytest.raises(ValueError):
+        next(gen._bucketed_batches(np.zeros((0, 4), dtype=np.int32)))
+
+
+def test_validation_split_of_a_tiny_corpus():
+    pytest.importorskip('keras')
+    cfg = sng.Config(verbose=False, hidden_dim=8, epochs=2,
+                     validation_split=0.1, early_stopping_patience=1,
+                     debug=True)
+    gen = sng.Generator(config=cfg, wordlist=['alpha', 'beta', 'gamma',
+                                              'delta', 'epsilon'])
+    # 10% of 5 words is no word, so there is nothing to validate on:
+    gen.fit()
+    assert 'val_loss' not in gen.debug['history']
+
+
+def test_checkpoints_and_resume(tmpdir):
+    pytest.importorskip('keras')
+    words = ['alpha', 'beta', 'gamma', 'delta', 'epsilon']
+    cfg = sng.Config(verbose=False, hidden_dim=8, epochs=2, batch_size=2,
+                     checkpoint_every=1)
+    directory = os.path.join(str(tmpdir), 'checkpoint')
+    sng.Generator(config=cfg, wordlist=words).fit(checkpoint_dir=directory)
+    with open(os.path.join(directory, 'training.json')) as f:
+        assert json.load(f) == {'epoch': 2}
+    assert sng.Generator.load(directory).simulate(3)
+
+    # An interruption between moving the old checkpoint aside and moving
+    # the new one in place leaves the old one:
+    os.rename(directory, directory + '.old')
+    cfg = sng.Config(verbose=False, hidden_dim=8, epochs=3, batch_size=2,
+                     checkpoint_every=1, debug=True)
+    gen = sng.Generator(config=cfg, wordlist=words)
+    gen.fit(checkpoint_dir=directory, resume_from=directory)
+    assert len(gen.debug['history']['loss']) == 1
+    with open(os.path.join(directory, 'training.json')) as f:
+        assert json.load(f) == {'epoch': 3}
+    assert not os.path.exists(directory + '.old')
+    assert not os.path.exists(directory + '.tmp')
+
+
+def test_early_stopping_on_validation_loss():
+    pytest.importorskip('keras')
+    cfg = sng.Config(verbose=False, hidden_dim=8, epochs=50, batch_size=2,
+                     validation_split=0.4, early_stopping_patience=0,
+                     learning_rate=0.5, debug=True)
+    gen = sng.Generator(config=cfg, wordlist=['alpha', 'beta', 'gamma',
+                                              'delta', 'epsilon'])
+    gen.fit()
+    history = gen.debug['history']
+    assert 'val_loss' in history
+    # With a patience of 0, training stops after the first epoch that
+    # doesn't improve the validation loss:
+    assert len(history['val_loss']) < 50
+    assert history['val_loss'][-1] >= min(history['val_loss'][:-1])
+
+
+def test_bucketed_batches():
+    cfg = sng.Config(verbose=False, batch_size=2, max_word_len=3)
+    words = ['a', 'bb', 'ccccccc', 'dddddd', 'e', 'ff']
+    gen = sng.Generator(config=cfg, wordlist=words)
+    seqs = sng.helpers.encode_words(gen.wordlist, gen.char_to_ix, 8)
+    batches = gen._bucketed_batches(seqs)
+    widths = sorted(next(batches)[0].shape[1] for _ in range(3))
+    # Padded to the longest word in the batch, and never truncated:
+    assert widths == [2, 3, 8]
+
+
+@pytest.mark.parametrize('embedding_dim', [None, 4])
+def test_encode_starts_words_like_the_decoders(embedding_dim):
+    cfg = sng.Config(verbose=False, embedding_dim=embedding_dim)
+    gen = sng.Generator(config=cfg, wordlist=['ab', 'b'])
+    X, Y, sample_weight = gen._encode(gen.wordlist)
+    a, b, end = gen.char_to_ix['a'], gen.char_to_ix['b'], gen.char_to_ix['\n']
+    # The first character is predicted from the start-of-word input:
+    assert Y[:, :, 0].tolist() == [[a, b, end], [b, end, 0]]
+    assert sample_weight.tolist() == [[1, 1, 1], [1, 1, 0]]
+    if embedding_dim:
+        assert X.tolist() == [[0, a + 1, b + 1], [0, b + 1, end + 1]]
+    else:
+        assert not np.any(X[:, 0])
+        assert np.argmax(X[:, 1:], axis=2).tolist() == [[a, b], [b, end]]
+
+
+def test_first_characters_are_learned():
+    pytest.importorskip('keras')
+    cfg = sng.Config(verbose=False, hidden_dim=16, epochs=50, batch_size=8,
+                     learning_rate=0.01)
+    words = ['q' + a + b for a in 'aeiou' for b in 'xyz']
+    gen = sng.Generator(config=cfg, wordlist=words)
+    gen.fit()
+    sampler = gen.to_sampler()
+    probs, _ = sampler.step(np.array([-1]), sampler.initial_state(1))
+    assert np.argmax(probs[0]) == gen.char_to_ix['q']
+
+
+def test_line_mode_with_capped_vocabulary(tmpdir):
+    wordlist_file = str(tmpdir.join('names.txt'))
+    with open(wordlist_file, 'w') as f:
+        f.write('Acme & Sons\n  Smith+Wesson \n\n'
+                'Acme & Sons\nZoë’s Café\n')
+
+    for use_cache in [False, True]:
+        cfg = sng.Config(verbose=False, line_mode=True, max_vocab_size=12,
+                         rare_buckets=2, use_cache=use_cache)
+        gen = sng.Generator(config=cfg, wordlist_file=wordlist_file)
+        assert gen.corpus_size == 3
+        assert len(gen.chars) <= 12
+        assert '\n' in gen.chars and ' ' in gen.chars
+        assert sum(char is not None for char in gen.bucket_chars) == 2
+        # Every word can be encoded with the capped vocabulary:
+        sng.helpers.encode_words(gen.wordlist, gen.char_to_ix, 20)
+        assert sorted(gen.wordlist) != \
+            ['Acme & Sons\n', 'Smith+Wesson\n', 'Zoë’s Café\n']
+
+    uncapped = sng.Generator(
+        config=sng.Config(verbose=False, line_mode=True),
+        wordlist_file=wordlist_file)
+    assert sorted(uncapped.wordlist) == \
+        ['Acme & Sons\n', 'Smith+Wesson\n', 'Zoë’s Café\n']
+    assert uncapped._is_known(['Acme & Sons', 'Acme & Co']).tolist() == \
+        [True, False]
+
+
+def test_best_names_and_log_likelihood(ngram_generator):
+    gen = ngram_generator
+    best = gen.best_names(3, min_word_len=4, max_word_len=6)
+    # The shortest word of the corpus is the most likely one:
+    assert best[0][0] == 'Beta Inc'
+
+    scores = gen.log_likelihood([name for name, _ in best] + ['Zeta'])
+    assert np.allclose(scores[:3], [score for _, score in best])
+    assert np.isneginf(scores[3])
+
+
+def test_score_streams_in_batches(ngram_generator):
+    gen = ngram_generator
+    names = ['Alpha Inc\n', 'Gamma', 'zeta', 'Deltalpha', 'Bet']
+    scores = gen.score(iter(names), batch_size=2)
+    assert not isinstance(scores, list)
+    scores = list(scores)
+
+    expected = gen.log_likelihood(names) / np.array([6, 6, 5, 10, 4])
+    assert np.allclose(scores, expected)
+    assert np.isneginf(scores[2])
+    # Corpus words fit the corpus better than made-up ones:
+    assert scores[0] > scores[3]
+    assert list(gen.score([])) == []
+
+
+def test_simulate_no_names(ngram_generator):
+    assert ngram_generator.simulate(0) == []
+    assert ngram_generator.simulate(0, new=True, unique=True) == []
+    assert list(ngram_generator.iter_simulate(0, unique=True)) == []
+
+
+def test_iter_simulate_yields_unique_batches(ngram_generator):
+    gen = ngram_generator
+    batches = list(gen.iter_simulate(25, batch_size=10, seed=0))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+    # With short words, the model runs out of unique names quickly:
+    names = [name for batch in gen.iter_simulate(
+        1000, batch_size=100, unique=True, min_word_len=2, max_word_len=2,
+        seed=0) for name in batch]
+    assert 0 < len(names) < 1000
+    assert len(set(name.lower() for name in names)) == len(names)
+
+
+def test_iter_simulate_finds_as_many_unique_names_as_simulate(
+        ngram_generator):
+    gen = ngram_generator
+    options = {'unique': True, 'min_word_len': 2, 'max_word_len': 2}
+    expected = set(gen.simulate(1000, seed=0, **options))
+    for batch_size in [7, 10, 100]:
+        names = [name for batch in gen.iter_simulate(
+            1000, batch_size=batch_size, seed=0, **options)
+            for name in batch]
+        assert set(names) == expected
+
+
+def test_new_names_without_saved_wordlist(tmpdir, ngram_generator):
+    directory = os.path.join(str(tmpdir), 'model')
+    ngram_generator.save(directory, include_wordlist=False)
+    assert not os.path.exists(os.path.join(directory, 'corpus'))
+
+    loaded = sng.Generator.load(directory)
+    names = loaded.simulate(20, new=True, seed=0)
+    assert len(names) == 20
+    assert not any(name[:-len(' Inc')].lower() in ['alpha', 'beta', 'gamma',
+                                                   'delta', 'epsilon']
+                   for name in names)
+
+    os.remove(os.path.join(directory, 'novelty.pkl'))
+    with pytest.raises(ValueError):
+        sng.Generator.load(directory).simulate(5, new=True)
+
+
+def test_cached_corpus_is_not_turned_into_a_wordlist(tmpdir):
+    cfg = sng.Config(backend='ngram', ngram_order=3)
+    sng.Generator(config=cfg, wordlist_file=LATIN)
+    # The second time, the corpus comes from the cache:
+    gen = sng.Generator(config=cfg, wordlist_file=LATIN)
+    assert gen.corpus is not None
+    gen.fit()
+    directory = os.path.join(str(tmpdir), 'model')
+    gen.save(directory)
+    assert gen._wordlist is None
+
+    loaded = sng.Generator.load(directory)
+    assert sorted(loaded.corpus) == sorted(gen.corpus)
+
+
+def test_unwritable_cache_falls_back_to_memory(tmpdir, monkeypatch):
+    # A file where the cache folder should be can't be created:
+    blocker = tmpdir.join('blocker')
+    blocker.write('')
+    monkeypatch.setenv('SNG_CACHE_DIR', str(blocker.join('sng')))
+    gen = sng.Generator(config=sng.Config(verbose=False),
+                        wordlist_file=LATIN)
+    assert gen.corpus is None
+    assert gen.corpus_size == len(gen.wordlist) > 0
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+import sng
+
+from sng import helpers
+
+
+def test_encode_words():
+    char_to_ix = {'\n': 0, 'a': 1, 'b': 2, 'ä': 3}
+    seqs = helpers.encode_words(['ab\n', 'bäa\n', '\n'], char_to_ix, 3)
+    assert seqs.tolist() == [[1, 2, 0], [2, 3, 1], [0, -1, -1]]
+
+    inputs = helpers.previous_char_inputs(seqs)
+    assert inputs.tolist() == [[-1, 1, 2], [-1, 2, 3], [-1, 0, -1]]
+
+    X = helpers.one_hot(seqs, 4)
+    assert X.dtype == np.float32
+    assert X[2, 1].sum() == 0
+    assert X[1, 1, 3] == 1
+
+
+def test_iter_wordlist_file_matches_read_wordlist_file():
+    path = os.path.join(os.path.dirname(sng.__file__), 'wordlists',
+                        'english.txt')
+    streamed = list(helpers.iter_wordlist_file(path, chunk_size=100))
+    assert streamed == helpers.read_wordlist_file(path)
+
+
+def test_shuffle_stream_keeps_all_items():
+    items = list(range(100))
+    shuffled = list(helpers.shuffle_stream(iter(items), 10))
+    assert sorted(shuffled) == items
+    assert shuffled != items
+
+
+def test_length_buckets():
+    lengths = np.array([5, 1, 3, 1, 5, 3, 2])
+    batches = helpers.length_buckets(lengths, 2, np.random.RandomState(0))
+    assert sorted(np.concatenate(batches).tolist()) == list(range(7))
+    # Words are grouped with their neighbors in length:
+    assert sorted(tuple(sorted(lengths[batch])) for batch in batches) == \
+        [(1, 1), (2, 3), (3, 5), (5,)]
+
+
+def test_temp_scale_is_safe():
+    probs = np.array([[0.0, 0.2, 0.8], [1.0, 0.0, 0.0]])
+    with np.errstate(all='raise'):
+        scaled = helpers.temp_scale(probs, 0.01)
+    assert np.allclose(scaled, [[0, 0, 1], [1, 0, 0]])
+    assert np.allclose(helpers.temp_scale(probs, 1.0), probs)
+
+
+def test_truncate_logits():
+    logits = np.log([[0.5, 0.3, 0.15, 0.05]])
+    assert np.isfinite(helpers.truncate_logits(logits, top_k=2)).tolist() \
+        == [[True, True, False, False]]
+    assert np.isfinite(helpers.truncate_logits(logits, top_p=0.8)).tolist() \
+        == [[True, True, False, False]]
+    assert np.isfinite(helpers.truncate_logits(logits, top_p=0.81)).tolist() \
+        == [[True, True, True, False]]
+
+
+def test_sample_gumbel():
+    with np.errstate(divide='ignore'):
+        logits = np.log(np.tile([[0.7, 0.3, 0.0]], (20000, 1)))
+    ix = helpers.sample_gumbel(logits, np.random.RandomState(0))
+    assert not np.any(ix == 2)
+    assert abs(np.mean(ix == 0) - 0.7) < 0.02
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+import sng
+from sng.helpers import text_to_word_sequence
+
+
+def test_import_does_not_load_keras():
+    code = ("import sys, sng; "
+            "sng.Config(); sng.show_builtin_wordlists(); "
+            "sng.load_builtin_wordlist('latin.txt'); "
+            "assert 'keras' not in sys.modules; "
+            "assert 'tensorflow' not in sys.modules")
+    subprocess.check_call([sys.executable, '-c', code])
+
+
+def test_text_to_word_sequence():
+    text = "Hello, World!  It's 2019 -- l'été\tde Zoë."
+    assert text_to_word_sequence(text) == [
+        'hello', 'world', 'it', 's', 'l', 'été\tde', 'zoë'
+    ]
+
+
+def test_load_builtin_wordlist():
+    wordlist = sng.load_builtin_wordlist('latin.txt')
+    assert len(wordlist) > 0
+    assert all(word == word.lower() for word in wordlist)
@@ -0,0 +1,30 @@
+import sng
+
+
+def test_pool_serves_from_buffer_after_refill(make_sampler):
+    pool = sng.NamePool(make_sampler(), capacity=50, max_keys=2)
+    try:
+        names = pool.get(5, temperature=0.5, suffix=' Labs')
+        assert len(names) == 5
+        assert all(name.endswith(' Labs') for name in names)
+        assert pool.stats['misses'] == 1
+
+        assert pool.wait_idle(timeout=10)
+        assert pool.stats['refills'] == 1
+        assert len(pool.get(5, temperature=0.5)) == 5
+        assert pool.stats['hits'] == 1
+
+        # A third key evicts the least recently used one:
+        pool.get(1, temperature=1.0)
+        pool.get(1, temperature=2.0)
+        assert pool.stats['evictions'] == 1
+    finally:
+        pool.close()
+
+
+def test_pool_uses_top_k_from_config(make_sampler):
+    pool = sng.NamePool(make_sampler(top_k=1, min_word_len=3), capacity=20)
+    try:
+        assert len(set(pool.get(10))) == 1
+    finally:
+        pool.close()
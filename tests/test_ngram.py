@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+
+import sng
+from sng.helpers import encode_words
+
+
+def test_counts_and_backoff():
+    chars = ['\n', 'a', 'b']
+    char_to_ix = {char: ix for ix, char in enumerate(chars)}
+    words = ['ab\n', 'aab\n', 'b\n']
+    model = sng.NGramModel.fit([encode_words(words, char_to_ix, 4)], chars,
+                               order=3)
+
+    assert np.allclose(model.probs[0], [[1 / 3, 1 / 3, 1 / 3]])
+    for probs in model.probs:
+        assert np.allclose(np.sum(probs, axis=1), 1)
+
+    # After 'b' at the start of a word, only the newline was ever seen,
+    # but lower orders still give the other characters some mass:
+    states = model.initial_state(2)
+    probs, states = model.step(np.array([-1, -1]), states)
+    probs, states = model.step(np.array([2, 1]), states)
+    assert probs[0, 0] == np.max(probs[0])
+    assert np.all(probs > 0)
+    # 'bb' was never seen, so this backs off to the context 'b':
+    probs, states = model.step(np.array([2, 1]), states)
+    assert np.allclose(probs[0], model.probs[1][model.contexts[1] == 2][0])
+
+
+def test_generator_roundtrip(tmpdir, ngram_generator):
+    gen = ngram_generator
+    assert gen.model is None
+    names = gen.simulate(20, min_word_len=3, max_word_len=6, seed=0)
+    assert all(3 <= len(name) - len(' Inc') <= 6 for name in names)
+
+    directory = os.path.join(str(tmpdir), 'model')
+    gen.save(directory)
+    assert not os.path.exists(os.path.join(directory, 'model.h5'))
+    loaded = sng.Generator.load(directory)
+    assert isinstance(loaded.sampler, sng.NGramModel)
+    assert loaded.simulate(20, min_word_len=3, max_word_len=6, seed=0) == \
+        names
+    assert isinstance(sng.Sampler.load(directory), sng.NGramModel)
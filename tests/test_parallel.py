@@ -0,0 +1,43 @@
+import numpy as np
+
+from sng.parallel import make_pool, sample_parallel, split_evenly
+
+
+def test_split_evenly():
+    assert split_evenly(10, 3) == [4, 3, 3]
+    assert split_evenly(2, 4) == [1, 1]
+
+
+def test_sample_parallel_is_reproducible(tmpdir, make_sampler):
+    make_sampler().save(str(tmpdir))
+    pool = make_pool(str(tmpdir), 2)
+    try:
+        first = sample_parallel(pool, 20, 2, np.random.RandomState(0),
+                                max_word_len=8)
+        second = sample_parallel(pool, 20, 2, np.random.RandomState(0),
+                                 max_word_len=8)
+    finally:
+        pool.close()
+        pool.join()
+    assert len(first) == 20
+    assert first == second
+
+
+def test_generator_simulate_with_workers(tmpdir, ngram_generator):
+    gen = ngram_generator
+    # Not saved yet, so the model is exported to a temporary folder:
+    names = gen.simulate(30, workers=2, seed=0)
+    assert len(names) == 30
+    assert names == gen.simulate(30, workers=2, seed=0)
+
+    unique = gen.simulate(30, workers=2, seed=0, unique=True)
+    assert len(set(name.lower() for name in unique)) == 30
+
+    # Saved, so the workers load the saved folder:
+    gen.save(str(tmpdir.join('model')))
+    assert gen.simulate(30, workers=2, seed=0) == names
+
+    # A folder without NumPy arrays, e.g. in the old pickle layout, is not
+    # used by the workers:
+    gen.directory = str(tmpdir.mkdir('old'))
+    assert gen.simulate(30, workers=2, seed=0) == names
@@ -0,0 +1,25 @@
+import numpy as np
+
+import sng
+
+
+def test_lazy_lru_loading(tmpdir, save_ngram_models):
+    root = str(tmpdir)
+    save_ngram_models(root, ['one', 'two', 'three'])
+    registry = sng.Registry(root, max_loaded=2)
+    assert registry.names() == ['one', 'three', 'two']
+    assert registry.stats['loads'] == 0
+
+    assert registry.simulate('one', 3)[0].endswith(' one')
+    assert registry.get('one') is registry['one']
+    registry.get('two')
+    registry.get('three')
+    assert registry.stats == {'loads': 3, 'evictions': 1}
+    # 'one' was the least recently used, so it's loaded again:
+    registry.get('one')
+    assert registry.stats['loads'] == 4
+
+    # The weights and the corpus are memory-mapped:
+    generator = registry.get('one')
+    assert isinstance(generator.sampler.probs[0], np.memmap)
+    assert generator._is_known(['alpha', 'gamma']).tolist() == [True, False]
@@ -0,0 +1,151 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import sng
+from sng.sampling import collect_words
+
+
+def test_step_returns_distributions(make_sampler):
+    sampler = make_sampler()
+    states = sampler.initial_state(3)
+    probs, states = sampler.step(np.array([-1, 0, 5]), states)
+    assert probs.shape == (3, sampler.vocab_size)
+    assert np.allclose(probs.sum(axis=1), 1)
+    assert len(states) == 4
+
+
+def test_simulate_respects_lengths(make_sampler):
+    sampler = make_sampler(min_word_len=3, max_word_len=6, suffix=' Inc')
+    words = sampler.simulate(n=50)
+    assert len(words) == 50
+    for word in words:
+        assert word.endswith(' Inc')
+        assert 3 <= len(word) - len(' Inc') <= 6
+
+
+def test_save_load_roundtrip(tmpdir, make_sampler):
+    sampler = make_sampler(suffix=' Labs')
+    sampler.save(str(tmpdir))
+    loaded = sng.Sampler.load(str(tmpdir))
+
+    assert loaded.chars == sampler.chars
+    assert loaded.config.suffix == ' Labs'
+    words = sampler.simulate(n=20, random_state=np.random.RandomState(1))
+    loaded_words = loaded.simulate(n=20,
+                                   random_state=np.random.RandomState(1))
+    assert words == loaded_words
+
+
+def test_log_likelihood_matches_steps(make_sampler):
+    sampler = make_sampler(chars=['\n'] + list('abc'))
+    scores = sampler.log_likelihood(['Cab', 'a', 'abx'])
+
+    states = sampler.initial_state(1)
+    expected = 0
+    for prev, ix in zip([-1, 3, 1, 2], [3, 1, 2, 0]):
+        probs, states = sampler.step(np.array([prev]), states)
+        expected += np.log(probs[0, ix])
+    assert np.isclose(scores[0], expected)
+    assert np.isfinite(scores[1])
+    assert np.isneginf(scores[2])
+
+
+def test_best_names_finds_the_most_likely_words(make_sampler):
+    sampler = make_sampler(chars=['\n'] + list('abc'))
+    words = [''.join(chars) for length in range(2, 5)
+             for chars in itertools.product('abc', repeat=length)]
+    scores = sampler.log_likelihood(words)
+    expected = [words[i].capitalize() for i in np.argsort(-scores)[:5]]
+
+    best = sampler.best_names(5, min_word_len=2, max_word_len=4,
+                              beam_width=100)
+    assert [name for name, _ in best] == expected
+    assert np.allclose([score for _, score in best], np.sort(scores)[::-1][:5])
+
+    # The default beam is narrower, but still yields sorted, valid names:
+    best = sampler.best_names(5, min_word_len=2, max_word_len=4,
+                              startswith='b', banned_chars='c')
+    assert len(best) == 5
+    assert [score for _, score in best] == sorted(
+        (score for _, score in best), reverse=True)
+    for name, _ in best:
+        assert name.startswith('B') and 'c' not in name
+        assert 2 <= len(name) <= 4
+
+
+def test_collect_words_unique_and_new():
+    rng = np.random.RandomState(0)
+    pool = ['Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon']
+
+    def sample(size):
+        return [pool[i] for i in rng.randint(len(pool), size=size)]
+
+    def is_known(words):
+        return np.array([word == 'Alpha' for word in words])
+
+    words, stats = collect_words(sample, 3, unique=True, is_known=is_known)
+    assert len(words) == 3
+    assert len(set(words)) == 3
+    assert 'Alpha' not in words
+    assert not stats['exhausted']
+
+    # Only four acceptable words exist, so asking for ten has to give up:
+    words, stats = collect_words(sample, 10, unique=True, is_known=is_known)
+    assert sorted(words) == ['Beta', 'Delta', 'Epsilon', 'Gamma']
+    assert stats['exhausted']
+
+
+def test_simulate_unique(make_sampler):
+    sampler = make_sampler(min_word_len=2, max_word_len=3)
+    words = sampler.simulate(n=30, unique=True)
+    assert len(words) == len(set(words))
+
+
+def test_simulate_constraints(make_sampler):
+    sampler = make_sampler(min_word_len=5, max_word_len=7)
+    words = sampler.simulate(n=100, startswith='Ab', endswith='h',
+                             banned_chars='cd', temperature=0.3)
+    for word in words:
+        assert word.startswith('Ab')
+        assert word.endswith('h')
+        assert 'c' not in word and 'd' not in word
+        assert 5 <= len(word) <= 7
+
+    # The arguments override the config:
+    words = sampler.simulate(n=100, min_word_len=2, max_word_len=2)
+    assert all(len(word) == 2 for word in words)
+
+
+def test_simulate_top_k(make_sampler):
+    sampler = make_sampler(min_word_len=3, max_word_len=6)
+    # Greedy decoding always produces the same word:
+    assert len(set(sampler.simulate(n=20, top_k=1))) == 1
+    assert len(set(sampler.simulate(n=20, top_p=1e-6))) == 1
+    assert len(set(sampler.simulate(n=20, top_k=3, temperature=1e-6))) == 1
+
+
+@pytest.mark.parametrize('embedding_dim', [None, 4])
+def test_from_model_matches_keras(embedding_dim):
+    pytest.importorskip('keras')
+    cfg = sng.Config(verbose=False, hidden_dim=8, n_layers=2,
+                     embedding_dim=embedding_dim)
+    gen = sng.Generator(config=cfg, wordlist=['alpha', 'beta', 'gamma'])
+    model = gen._build_model()
+    # Random biases as well, so that every weight matters:
+    rng = np.random.RandomState(0)
+    model.set_weights([rng.randn(*w.shape) * 0.5
+                       for w in model.get_weights()])
+
+    sampler = sng.Sampler.from_model(model, gen.chars, cfg)
+    decoder = gen._decoder(gen._build_step_model(model))
+    seqs = np.array([[-1, 3, 1, 2], [-1, 2, 2, 1]])
+    states = sampler.initial_state(2)
+    keras_states = decoder.initial_state(2)
+    for t in range(seqs.shape[1]):
+        probs, states = sampler.step(seqs[:, t], states)
+        keras_probs, keras_states = decoder.step(seqs[:, t], keras_states)
+        assert np.allclose(probs, keras_probs, atol=1e-5)
+        for state, keras_state in zip(states, keras_states):
+            assert np.allclose(state, keras_state, atol=1e-5)
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+import sng
+from sng.server import NameServer
+
+
+async def fetch(port, target):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(('GET ' + target + ' HTTP/1.1\r\n\r\n').encode())
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    return head.split(b'\r\n')[0].decode(), json.loads(body.decode())
+
+
+def test_concurrent_requests_are_batched(make_sampler):
+    server = NameServer(make_sampler(), batch_window=0.05)
+    batch_sizes = []
+    sample_batch = server._sample_batch
+
+    def recording_sample_batch(requests):
+        batch_sizes.append(len(requests))
+        return sample_batch(requests)
+
+    server._sample_batch = recording_sample_batch
+
+    async def run():
+        tcp_server = await server.start('127.0.0.1', 0)
+        port = tcp_server.sockets[0].getsockname()[1]
+        responses = await asyncio.gather(
+            fetch(port, '/names?n=3&suffix=%20Labs'),
+            fetch(port, '/names?n=5&temperature=0.5&max_word_len=6'),
+            fetch(port, '/names?n=0'),
+            fetch(port, '/other'),
+        )
+        tcp_server.close()
+        await server.stop()
+        return responses
+
+    loop = asyncio.new_event_loop()
+    try:
+        responses = loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+    (status1, body1), (status2, body2), (status3, _), (status4, _) = responses
+    assert status1.endswith('200 OK')
+    assert len(body1['names']) == 3
+    assert all(name.endswith(' Labs') for name in body1['names'])
+    assert len(body2['names']) == 5
+    assert all(len(name) <= 6 for name in body2['names'])
+    assert status3.endswith('400 Bad Request')
+    assert status4.endswith('404 Not Found')
+    assert batch_sizes == [2]
+
+
+def test_registry_models(tmpdir, save_ngram_models):
+    save_ngram_models(str(tmpdir), ['one', 'two'])
+    server = NameServer(sng.Registry(str(tmpdir)), batch_window=0.05)
+
+    async def run():
+        tcp_server = await server.start('127.0.0.1', 0)
+        port = tcp_server.sockets[0].getsockname()[1]
+        responses = await asyncio.gather(
+            fetch(port, '/names?model=one&n=2'),
+            fetch(port, '/names?model=two&n=3'),
+            fetch(port, '/names?model=three'),
+        )
+        tcp_server.close()
+        await server.stop()
+        return responses
+
+    loop = asyncio.new_event_loop()
+    try:
+        (_, body1), (_, body2), (status3, _) = loop.run_until_complete(run())
+    finally:
+        loop.close()
+
+    assert len(body1['names']) == 2
+    assert all(name.endswith(' one') for name in body1['names'])
+    assert len(body2['names']) == 3
+    assert all(name.endswith(' two') for name in body2['names'])
+    assert status3.endswith('400 Bad Request')
+
+
+def test_word_lengths_are_capped(make_sampler):
+    from sng.server import _BadRequest
+
+    server = NameServer(make_sampler(), max_word_len=20)
+    assert server._parse_options('max_word_len=20')['max_word_len'] == 20
+    for query in ['n=100&max_word_len=1000000000',
+                  'min_word_len=1000000000']:
+        with pytest.raises(_BadRequest):
+            server._parse_options(query)
+
+
+def test_top_k_from_config(make_sampler):
+    server = NameServer(make_sampler(top_k=1, min_word_len=3))
+    requests = [server._parse_options('n=10'),
+                server._parse_options('n=5&suffix=%20Labs')]
+    names = server._sample_batch(requests)
+    # Greedy decoding always produces the same word:
+    assert len(set(names[0])) == 1
+    assert names[1] == [name + ' Labs' for name in names[0][:5]]